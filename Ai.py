@@ -1,5 +1,4 @@
-import csv
-import math
+import os
 from Board import Move
 from main import display_board
 from main import load_images
@@ -7,118 +6,123 @@ import pygame as p
 import random
 import time
 import json
+import threading
+from multiprocessing import Pool, Value
+from TranspositionTable import TranspositionTable
+from TranspositionTable import EXACT, LOWER_BOUND, UPPER_BOUND
+from MovePicker import pick_moves
+from MovePicker import mvv_lva, history_index, capture_value, CAPTURE_VALUES, HISTORY_SIZE
+from Board import CAPTURE_MOVES, QUIET_MOVES
+from Evaluation import evaluate
+from SearchStats import SearchStats
+from OpeningBook import get_default_book, get_book_key
+from MonteCarloTree import MonteCarloTree, ROOT, NO_NODE
 
-# All openings, which are still possible
-current_possible_openings = []
-
-
-# Returns the value of the different pieces
-def get_piece_value(piece):
-    # Pawn is worth 10
-    if piece == 1 or piece == 11:
-        return 10
-    # Knight is worth 20
-    elif piece == 2 or piece == 12:
-        return 30
-    # Bishop is worth 30
-    elif piece == 3 or piece == 13:
-        return 30
-    # Rook is worth 50
-    elif piece == 4 or piece == 14:
-        return 50
-    # Queen is worth 90
-    elif piece == 5 or piece == 15:
-        return 90
-    else:
-        return 0
+# Memory of the transposition table in megabytes
+TRANSPOSITION_TABLE_SIZE = 16
+# The highest history score (captures are sorted above it)
+HISTORY_LIMIT = 1 << 20
 
+# Default thinking time per move in seconds
+MOVE_TIME = 2
+# Part of the remaining time on the clock, which is used for one move (if playing with a clock)
+MOVES_TO_GO = 30
+# The deepest iteration of the iterative deepening
+MAX_DEPTH = 64
+# Number of positions between two looks at the clock
+TIME_CHECK_INTERVAL = 1024
+
+# Number of processes of the parallel search (0 or 1 => the search runs in this process)
+SEARCH_PROCESSES = 0
+# The first iterations are too short for the parallel search
+PARALLEL_MIN_DEPTH = 3
+# The engine of a process of the pool of the parallel search (see init_search_process)
+process_engine = None
+
+# File of the trained monte carlo tree (see MonteCarloTree.save) and of the old tree of nested dicts (converted at the
+# start of the training, if there is no trained tree yet)
+MCTS_FILE = "mcts1.bin"
+MCTS_JSON_FILE = "mcts1.json"
+
+# Seconds to wait before a book move is made (e.g. 0.4, so a game of the ai against itself can be followed)
+BOOK_MOVE_DELAY = 0
+
+# Switches of the search techniques (to measure what each one saves)
+USE_TRANSPOSITION_TABLE = True
+# Move picker with hash move, MVV-LVA, killer moves and history (else the moves are searched as they are generated)
+USE_MOVE_ORDERING = True
+USE_QUIESCENCE = True
+USE_PRINCIPAL_VARIATION_SEARCH = True
+USE_ASPIRATION_WINDOWS = True
+USE_NULL_MOVE = True
+
+# Value of a checkmate at the first node (minus the number of moves to the checkmate)
+MATE_SCORE = 100000
+# Every score above is a checkmate
+MATE_BOUND = MATE_SCORE - 1000
+# Bigger than every score
+INFINITY = MATE_SCORE + 1
+# Half the width of the first aspiration window (10 = one pawn)
+ASPIRATION_WINDOW = 5
+# The null move is searched with the depth - 1 - NULL_MOVE_REDUCTION
+NULL_MOVE_REDUCTION = 2
+# Minimum depth to try a null move
+NULL_MOVE_MIN_DEPTH = 3
+# If the phase (see Evaluation) is not bigger, a null move cutoff is verified by a normal search
+NULL_MOVE_VERIFICATION_PHASE = 6
+
+USE_LATE_MOVE_REDUCTIONS = True
+USE_FUTILITY = True
+USE_REVERSE_FUTILITY = True
+# Late move reductions: from the depth LMR_MIN_DEPTH on, the quiet moves after the first LMR_MIN_MOVES moves are
+# searched LMR_REDUCTION plies less deep (LMR_DEEP_REDUCTION after the first LMR_DEEP_MOVES moves)
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 4
+LMR_REDUCTION = 1
+LMR_DEEP_MOVES = 12
+LMR_DEEP_REDUCTION = 2
+# Futility pruning: margin for the depth 1, 2, ... (the quiet moves are skipped at this depth if the static score plus
+# the margin is not above alpha; index 0 is unused)
+FUTILITY_MARGINS = [0, 20, 45]
+# Reverse futility pruning: up to this depth the node is cut off if the static score minus the margin per ply is still
+# at least beta
+REVERSE_FUTILITY_MAX_DEPTH = 3
+REVERSE_FUTILITY_MARGIN = 15
+
+# A capture is skipped in the quiescence search if it can not bring the score up to alpha even with this margin
+DELTA_MARGIN = 20
+# Search the quiet moves which give check at the first ply of the quiescence search as well
+QUIESCENCE_CHECKS = False
+
+
+# Raised in the search when the time is over (the search is unwound up to find_best_move)
+class SearchTimeout(Exception):
+    pass
 
-# Returns the value of the current board state (negative is good for black and positive is good for white)
-def get_value_of_board(board):
-    # Return value
-    value = 0
-    # This map indicates the points where knights and pawns are most valuable
-    pawn_knight_map = [
-        [0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 2, 1, 1, 2, 0, 0],
-        [0, 0, 2, 4, 4, 2, 0, 0],
-        [0, 0, 2, 4, 4, 2, 0, 0],
-        [0, 0, 2, 1, 1, 2, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0]]
-    # If there is a checkmate the value is infinity or -infinity
-    if board.checkmate:
-        return float("-inf") if board.white_move else float("inf")
-    # Stalemate is worth 0
-    if board.stalemate:
-        return 0
-    # Iterate through state to count material
-    for i in range(len(board.state)):
-        for j in range(len(board.state[i])):
-            # COUNT MATERIAL
-            piece = board.state[i][j]
-            # Black pieces
-            if piece > 10:
-                value -= get_piece_value(piece)
-            # White pieces
-            elif piece != 0:
-                value += get_piece_value(piece)
-
-            # USE THE KNIGHT/PAWN MAP
-            # Check if the piece is white pawn or knight (add value)
-            if piece == 1 or piece == 2:
-                value += pawn_knight_map[i][j]
-            # Check if the piece is a black pawn or knight (subtract value)
-            elif piece == 11 or piece == 12:
-                value -= pawn_knight_map[i][j]
-
-    # Iterate through moves in the past
-    for move in board.move_history:
-        # REWARD CASTLING
-        if move.is_castle and move.piece == 6:
-            value += 15
-        elif move.is_castle and move.piece == 16:
-            value -= 15
-
-    return value
-
-
-# Uses the best algorithm to find a move
-def find_best_move(board, legal_moves, speed, use_openings=True, ):
-    # Counts the number of calculated positions calls
-    global position_counter
-    position_counter = 0
-    # Check if it should use openings and check if its one of the first moves or we have possible openings
-    if use_openings and (0 < len(board.move_history) < 3 or len(current_possible_openings) != 0):
-        # Wait a small amount of time, so it wont move instantly if ai is playing against itself
-        time.sleep(0.4)
-        # Check if the openings are still usable
-        check_for_opening_move(board)
-        # Check if after the new openings calculation there is still an opening
-        if len(current_possible_openings) > 0:
-            # Take a random opening out of the possible ones
-            opening = current_possible_openings[random.randint(0, len(current_possible_openings)) - 1]
-            # Split the notation list into single notations
-            moves_str_list = opening[3].split(' ')
-            # Transform the notation list into usable move classes
-            moves_in_opening = notation_list_to_moves(moves_str_list)
-            # Get the next move from the opening
-            move = moves_in_opening[len(board.move_history)]
-            # Get the same move as a legal move (if there is some special move, the move would not have the right
-            # properties if we take it out of the opening)
-            for legal_move in legal_moves:
-                if move == legal_move:
-                    move = legal_move
-            # Print the opening name
-            print("Playing the " + opening[1])
-            # Return the move as the best move
-            return move
-        print('No openings found :/')
-    # Shuffle the list so there is variety
-    random.shuffle(legal_moves)
-    # Return the min max algorithm
-    return find_min_max_alpha_beta(speed//len(legal_moves) if speed//len(legal_moves) > 4 else 4, legal_moves, board, float("-inf"), float("inf"), True)
+
+# Uses the best algorithm to find a move (with the engine which is shared by all games of this module, see Engine for
+# games which are played at the same time)
+# move_time: seconds for the move; time_left and increment: the clock of the player in seconds (used instead of
+# move_time if time_left is given); max_depth: the deepest search
+# processes: number of processes of the parallel search (0 or 1 => the search runs in this process)
+def find_best_move(board, legal_moves, move_time=MOVE_TIME, use_openings=True, time_left=None, increment=0,
+                   max_depth=MAX_DEPTH, processes=SEARCH_PROCESSES, stats_hook=None):
+    return get_default_engine().find_best_move(board, legal_moves, move_time, use_openings, time_left, increment,
+                                               max_depth, processes, stats_hook)
+
+
+# Stops the processes of the parallel search of the shared engine
+def close_search_pool():
+    if default_engine is not None:
+        default_engine.close_search_pool()
+
+
+# Returns the time for the next move in seconds
+# (the fixed time per move or a part of the remaining time on the clock and most of the increment)
+def get_move_time(move_time, time_left=None, increment=0):
+    if time_left is None:
+        return move_time
+    return min(time_left / MOVES_TO_GO + increment * 0.8, time_left / 2)
 
 
 # Return a random move out of legal_moves
@@ -129,212 +133,691 @@ def find_random_move(legal_moves, delay=0):
     return None
 
 
-# Uses the MinMaxAlgorithm with alpha beta pruning to find a move Takes a search depths, the current legal moves,
-# the board, a, b, and the is_first boolean, which is true if its the first node in the tree
-def find_min_max_alpha_beta(depth, moves, board, a, b, is_first, use_move_sorting=True):
-    # Check if move sorting is activated which makes the algorithm for efficient
-    if use_move_sorting:
-        # Sort the moves according to capture value (reverse = true, because captures should be looked at first)
-        moves.sort(key=sort_moves, reverse=True)
-    # Position_counter stores the number of positions calculated
-    # Best_move is the best move
-    global position_counter, best_move
-    # Check if its the first Node
-    # Assign the best_move to a random move => if there is no best move, it will pick a random
-    if is_first:
-        best_move = find_random_move(moves)
-    # Foreach time in this function the position counter increases, because its a new position
-    position_counter += 1
-    # Check if the depth is 0 => we completed a branch; or if the game ended
-    if depth == 0 or board.checkmate or board.stalemate:
-        # Get the value of the current state
-        value = get_value_of_board(board)
-        # Check if its the first Node
-        if is_first:
-            # If so return the best move
-            return best_move
-        # Return the value of the state to the node above
-        return value
-    # The max depth is not reached yet => go deeper
-    # Check if its whites turn
-    elif board.white_move:
-        # The best evaluation for white is initially -infinity => white tries to maximize the value => high value is
-        # good for white
-        max_eval = float("-inf")
-        # Iterate through all the moves for white
-        for move in moves:
-            # Make the move pseudo
-            board.make_move(move)
-            # Create a new child node (with depth -1 => the depth get every time smaller, so sometime when it is
-            # zero, it will return a value all the way up)
-            evaluation = find_min_max_alpha_beta(depth - 1, board.get_legal_moves(), board, a, b, False)
-            # Check if the evaluation of this child is greater (white tries to maximize) than the max_eval
-            if evaluation > max_eval:
-                # Set the max eval
-                max_eval = evaluation
-                # If its the first node, the new best value is also the best move
-                if is_first:
-                    best_move = move
-            # Undo the pseudo move
-            board.make_move(move, undo=True)
-            # Set the alpha to the new max
-            a = max(a, evaluation)
-            # If beta is lower than alpha the rest of the tree is not important anymore, because there can not be a
-            # better value
-            if b <= a:
+# A chess engine which owns all the state of its searches (transposition table, killer moves, history, statistics,
+# the opening book position and the stop flag), so every game (or thread) can search with its own engine
+class Engine:
+    def __init__(self, transposition_table_size=TRANSPOSITION_TABLE_SIZE, book=None):
+        # Stores the results of already searched positions (kept between the moves)
+        self.transposition_table = TranspositionTable(transposition_table_size)
+        # The last two quiet moves which caused a beta cutoff at every ply {moves from the first node: [move, move]}
+        # (cleared for every search)
+        self.killer_moves = {}
+        # How often a quiet move (player, old square, new square) caused a beta cutoff, weighted by the depth
+        # (halved for every search, so old results count less)
+        self.history_table = [0] * HISTORY_SIZE
+        # Counters and results of the current (or last) search
+        self.stats = SearchStats()
+        # The opening book (None => the book of the openings folder, see get_book)
+        self.book = book
+        # The time (time.time()) when the current search has to stop (None => no limit)
+        self.search_deadline = None
+        # Start and seconds of the current search (changed by a ponder hit)
+        self.search_start_time = 0
+        self.search_budget = 0
+        # Set by stop (from another thread) to end the current search, the move of the last finished iteration is used
+        self.stop_requested = False
+        # The evaluation of the best move of the last search at the first node (for the player to move)
+        self.root_score = 0
+        # Number of the current search (a process of the pool prepares its tables when a new search starts)
+        self.search_number = 0
+        self.process_search_number = 0
+        # The process pool of the parallel search (see get_search_pool) and the number of its processes
+        self.search_pool = None
+        self.search_pool_size = 0
+        # The best score at the first node of the current iteration (shared by all processes of the pool)
+        self.shared_alpha = None
+        # Thread of the search on the time of the other player (see start_pondering), the expected move of the other
+        # player, the zobrist key after it and the result of the search (move, SearchStats)
+        self.ponder_thread = None
+        # Held while a thread ends the pondering, so only one thread waits for the ponder thread and no other search
+        # of the engine starts before it ended
+        self.ponder_lock = threading.Lock()
+        self.ponder_move = None
+        self.ponder_key = 0
+        self.ponder_result = None
+
+    # Forgets everything about the last game (the tables)
+    def new_game(self):
+        self.transposition_table.clear()
+        self.killer_moves.clear()
+        self.history_table = [0] * HISTORY_SIZE
+        self.root_score = 0
+
+    # Ends the current search (can be called from another thread)
+    def stop(self):
+        self.stop_requested = True
+
+    # Starts a search on the time of the other player (pondering), after the engine moved on the board
+    # The expected move of the other player (the best move of the transposition table) is made on a copy of the board
+    # and the position after it is searched in a thread without a time limit, with the tables of the engine
+    # Returns false if there is nothing to ponder on (no expected move or the game is in the opening book)
+    def start_pondering(self, board):
+        book = self.get_book()
+        if self.ponder_thread is not None or book is not None and len(book.get_moves(get_book_key(board))) > 0:
+            return False
+        entry = self.transposition_table.probe(board.zobrist_key)
+        if entry is None or entry[3] == 0:
+            return False
+        # The game goes on on the board while the engine searches on the copy
+        ponder_board = board.copy()
+        legal_moves = ponder_board.get_legal_moves()
+        if Move(entry[3]) not in legal_moves:
+            return False
+        self.ponder_move = legal_moves[legal_moves.index(Move(entry[3]))]
+        ponder_board.make_move(self.ponder_move)
+        self.ponder_key = ponder_board.zobrist_key
+        ponder_moves = ponder_board.get_legal_moves()
+        if len(ponder_moves) == 0 or ponder_board.stalemate:
+            return False
+        self.ponder_result = None
+        # Cleared here and not in the thread, so a stop right after the start is never lost
+        self.stop_requested = False
+        ponder_thread = threading.Thread(target=self.ponder, args=(ponder_board, ponder_moves), daemon=True)
+        with self.ponder_lock:
+            # The pondering has no time limit until a ponder hit gives it one (set before the thread starts, so the
+            # thread never overwrites the time of a hit)
+            self.search_start_time = time.time()
+            self.search_budget = float("inf")
+            self.ponder_thread = ponder_thread
+        ponder_thread.start()
+        return True
+
+    # Runs in the thread of start_pondering (until finish_pondering gives it a time limit or stops it)
+    # The search of the pondering runs in one process, the processes of the parallel search can not be stopped
+    def ponder(self, board, legal_moves):
+        self.ponder_result = self.search_move(board, legal_moves, False, processes=0)
+
+    # Stops the pondering (if the engine ponders) and waits for its thread, the result is not used
+    def stop_pondering(self):
+        if self.ponder_thread is None:
+            return
+        # Stop before waiting for the lock, another thread could wait for the pondering in finish_pondering
+        self.stop()
+        with self.ponder_lock:
+            if self.ponder_thread is not None:
+                self.ponder_thread.join()
+                self.ponder_thread = None
+
+    # Ends the pondering after the other player moved on the board
+    # If the other player played the expected move (ponder hit), the search goes on with the time for the move and its
+    # move is returned; else (ponder miss) the search is stopped and None is returned (the tables stay filled, so the
+    # next search starts faster)
+    # move_time, time_left, increment: the time for the move (see find_best_move)
+    def finish_pondering(self, board, move_time=MOVE_TIME, time_left=None, increment=0):
+        with self.ponder_lock:
+            if self.ponder_thread is None:
+                return None
+            ponder_hit = len(board.move_history) > 0 and board.move_history[-1] == self.ponder_move and \
+                board.zobrist_key == self.ponder_key
+            if ponder_hit:
+                # The search counts as started now
+                self.search_start_time = time.time()
+                self.search_budget = get_move_time(move_time, time_left, increment)
+                if self.search_deadline is not None:
+                    self.search_deadline = self.search_start_time + self.search_budget
+            else:
+                self.stop()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+        if not ponder_hit or self.ponder_result is None or self.ponder_result[0] is None:
+            return None
+        # Use the move out of the legal moves of the board (the move of the search belongs to the copy)
+        legal_moves = board.get_legal_moves()
+        move = self.ponder_result[0]
+        return legal_moves[legal_moves.index(move)] if move in legal_moves else None
+
+    # Returns the opening book of the engine (the book of the openings folder is opened at the first use; None if
+    # there is no book)
+    def get_book(self):
+        if self.book is None:
+            self.book = get_default_book()
+        return self.book
+
+    # Returns a move of the opening book for the position of the board (chosen by the frequency of the move) or None
+    # if the position is not in the book (found by the zobrist key, so also after a transposition)
+    def get_book_move(self, board, legal_moves):
+        book = self.get_book()
+        if book is None:
+            return None
+        key = get_book_key(board, legal_moves)
+        move = book.choose_move(key, legal_moves)
+        if move is None:
+            return None
+        # Print the name of the opening if an opening of the book ends in the position (looked up by its key, the
+        # board is not changed)
+        opening = book.get_opening(key)
+        if opening is not None:
+            print("Playing the " + opening[1])
+        return move
+
+    # Returns the best move (see search_best_move)
+    def find_best_move(self, board, legal_moves, move_time=MOVE_TIME, use_openings=True, time_left=None, increment=0,
+                       max_depth=MAX_DEPTH, processes=SEARCH_PROCESSES, stats_hook=None):
+        return self.search_best_move(board, legal_moves, move_time, use_openings, time_left, increment, max_depth,
+                                     processes, stats_hook)[0]
+
+    # Same as find_best_move, but returns (move, SearchStats of the search)
+    # stats_hook: called with every finished iteration (see SearchStats.end_iteration, SearchStats.json_lines_hook and
+    # SearchStats.print_hook; nothing is printed without a hook)
+    def search_best_move(self, board, legal_moves, move_time=MOVE_TIME, use_openings=True, time_left=None, increment=0,
+                         max_depth=MAX_DEPTH, processes=SEARCH_PROCESSES, stats_hook=None):
+        # A stop request of an earlier search is not for this one
+        self.stop_requested = False
+        self.search_start_time = time.time()
+        self.search_budget = get_move_time(move_time, time_left, increment)
+        return self.search_move(board, legal_moves, use_openings, max_depth, processes, stats_hook)
+
+    # Same as search_best_move, but a stop request which came before the start stops the search too and the time of
+    # the search (search_start_time and search_budget) is set by the caller (for the pondering, see start_pondering)
+    def search_move(self, board, legal_moves, use_openings=True, max_depth=MAX_DEPTH, processes=SEARCH_PROCESSES,
+                    stats_hook=None):
+        self.stats = SearchStats(stats_hook)
+        # Take the move out of the opening book if the game is still in the book
+        if use_openings:
+            move = self.get_book_move(board, legal_moves)
+            if move is not None:
+                # Wait, so the move is not made instantly if the ai is playing against itself
+                if BOOK_MOVE_DELAY > 0:
+                    time.sleep(BOOK_MOVE_DELAY)
+                self.stats.book_move = True
+                return move, self.stats
+        # Shuffle the list so there is variety
+        random.shuffle(legal_moves)
+        self.prepare_search()
+        # Iterative deepening: search with depth 1, 2, 3, ... until the time is over
+        # (every iteration stores its best moves in the transposition table, so the next one looks at them first)
+        root_length = len(board.move_history)
+        move = None
+        for depth in range(1, max_depth + 1):
+            # The first iteration always finishes, so there is always a move
+            self.search_deadline = self.search_start_time + self.search_budget if depth > 1 else None
+            try:
+                move = self.search_with_aspiration_window(depth, legal_moves, board, processes)
+            except SearchTimeout:
+                # Take back the moves of the unfinished search (the move of the last finished iteration is used)
+                take_back_search_moves(board, root_length)
                 break
+            self.stats.end_iteration(depth, self.root_score, self.get_principal_variation(board, depth),
+                                     self.transposition_table)
+            # Stop if a checkmate was found or if the next iteration would probably not finish in time
+            if abs(self.root_score) >= MATE_BOUND or time.time() - self.search_start_time > self.search_budget / 2:
+                break
+        self.search_deadline = None
+        return move, self.stats
 
-        # If it is the first value, it should return a move
-        if is_first:
-            print("Evaluation in " + str(depth) + " Moves: " + str(max_eval / 10) + " (calculated " + str(
-                position_counter) + " positions)")
-            return best_move
-        # Pass the evaluation to the parent node
-        return max_eval
-    else:
-        # The best evaluation for black is initially infinity => black tries to minimize the value => low value is
-        # good for black
-        min_eval = float("inf")
-        # Iterate through all the moves for black
-        for move in moves:
-            # Make the move pseudo
-            board.make_move(move, )
-            # Create a new child node (with depth -1 => the depth get every time smaller, so sometime when it is
-            # zero, it will return a value all the way up)
-            evaluation = find_min_max_alpha_beta(depth - 1, board.get_legal_moves(), board, a, b, False)
-            # Check if the evaluation of this child is lower (black tries to minimize) than the min_eval
-            if evaluation < min_eval:
-                # Set the min eval
-                min_eval = evaluation
-                # If its the first node, the new best value is also the best move
-                if is_first:
-                    best_move = move
-            # Undo the pseudo move
-            board.make_move(move, undo=True)
-            # Set the beta to the new min
-            b = min(b, evaluation)
-            # If beta is lower than alpha the rest of the tree is not important anymore, because there can not be a
-            # better value
-            if b <= a:
+    # Returns the expected moves of both players from the position (as notations), taken from the best moves stored in
+    # the transposition table (at most max_length moves)
+    def get_principal_variation(self, board, max_length):
+        moves = []
+        keys = set()
+        while len(moves) < max_length and board.zobrist_key not in keys:
+            keys.add(board.zobrist_key)
+            entry = self.transposition_table.probe(board.zobrist_key)
+            if entry is None or entry[3] == 0:
                 break
+            # Use the move out of the legal moves (the stored one could be from another position with the same key)
+            legal_moves = board.get_legal_moves()
+            if Move(entry[3]) not in legal_moves:
+                break
+            move = legal_moves[legal_moves.index(Move(entry[3]))]
+            moves.append(move_to_notation(move))
+            board.make_move(move)
+        for i in range(len(moves)):
+            board.unmake_move()
+        return moves
 
-        # If it is the first value, it should return a move
-        if is_first:
-            print("Evaluation in " + str(depth) + " Moves: " + str(min_eval / 10) + " (calculated " + str(
-                position_counter) + " positions)")
-            return best_move
-        # Pass the evaluation to the parent node
-        return min_eval
-
-
-# Key function of move sorting (sort the moves according to captures)
-def sort_moves(move):
-    return get_piece_value(move.captured_piece)
-
-
-# Takes the current state checks for current possible openings and sets the global variable
-def check_for_opening_move(board):
-    # This is the first or second (black or white) move of the game, so we want to iterate through
-    # the whole directory
-    if 0 < len(board.move_history) < 3:
-        # File names of the opening information
-        files = ["a.tsv", "b.tsv", "c.tsv", "d.tsv", "e.tsv"]
-        # Iterate through all the opening files
-        for file_name in files:
-            # Open the file as a csv file
-            with open("openings/" + file_name) as csv_file:
-                # Read the csv file
-                opening_lib = csv.reader(csv_file, delimiter='\t')
-                # Iterate through all the rows in the csv file
-                for r in opening_lib:
-                    # The moves of the opening are in the 3rd column of the csv file
-                    moves_str = r[3]
-                    # At the first row there is a explanation of the columns => do not read that
-                    if moves_str != "moves":
-                        # Split the moves string into separate moves
-                        moves_str_list = moves_str.split(' ')
-                        # Transform the simple string notation into moves
-                        moves_in_opening = notation_list_to_moves(moves_str_list)
-                        # Check if the moves from this opening were actual played, so we can use the next move of
-                        # this opening
-                        # Also check if there is a move left
-                        if board.move_history == moves_in_opening[:len(board.move_history)] and len(
-                                moves_in_opening) > len(board.move_history):
-                            # Append the row of the csv to the current possible openings
-                            current_possible_openings.append(r)
-    # We are not at the first move => Check if there are any openings left
-    elif len(current_possible_openings) != 0:
-        print('Searching for openings... in ' + str(len(current_possible_openings)) + " different openings")
-        # Iterate through all the openings (Backwards, because we want to remove the opening if it is not fitting
-        # anymore)
-        for i in range(len(current_possible_openings) - 1, -1, -1):
-            # Get the 3rd Column (the move notation)
-            moves_str = current_possible_openings[i][3]
-            # Split the moves string into separate moves
-            moves_str_list = moves_str.split(' ')
-            # Transform the simple string notation into moves
-            moves_in_opening = notation_list_to_moves(moves_str_list)
-            # Check if the moves from this opening were actual played, so we can use the next move of
-            # this opening
-            # Also check if there is a move left
-            if board.move_history == moves_in_opening[:len(board.move_history)] and len(moves_in_opening) > len(
-                    board.move_history):
-                # If so the opening is still usable
-                pass
+    # Prepares the tables for a new search
+    def prepare_search(self):
+        self.search_number += 1
+        # Entries of older searches can now be replaced
+        self.transposition_table.new_search()
+        # The killer moves of the last search are from other positions
+        self.killer_moves.clear()
+        # Age the history
+        for i in range(HISTORY_SIZE):
+            self.history_table[i] //= 2
+
+    # Searches the first node with a small window around the score of the last iteration (most moves are refuted faster)
+    # If the score is outside of the window, the window is made wider on that side and the search is repeated
+    # processes: see find_best_move (the first iterations are always searched in this process)
+    def search_with_aspiration_window(self, depth, moves, board, processes=0):
+        if processes > 1 and depth >= PARALLEL_MIN_DEPTH:
+            def root_search(a, b):
+                return self.parallel_search_root(depth, moves, board, a, b, processes)
+        else:
+            def root_search(a, b):
+                return self.search_root(depth, moves, board, a, b)
+        if not USE_ASPIRATION_WINDOWS or depth == 1 or abs(self.root_score) >= MATE_BOUND:
+            return root_search(-INFINITY, INFINITY)
+        window = ASPIRATION_WINDOW
+        a, b = self.root_score - window, self.root_score + window
+        while True:
+            move = root_search(a, b)
+            if self.root_score <= a:
+                a = max(self.root_score - window, -INFINITY)
+            elif self.root_score >= b:
+                b = min(self.root_score + window, INFINITY)
             else:
-                # The opening is not usable anymore
-                current_possible_openings.remove(current_possible_openings[i])
-
-
-# Transforms a list of notations into moves (is starting at the init state, so only openings are transformable)
-def notation_list_to_moves(notation_list):
-    # Initialize the state
-    state = [
-        [14, 12, 13, 15, 16, 13, 12, 14],
-        [11, 11, 11, 11, 11, 11, 11, 11],
-        [0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0],
-        [1, 1, 1, 1, 1, 1, 1, 1],
-        [4, 2, 3, 5, 6, 3, 2, 4]]
-    # List which will be returned
-    moves = []
-    # Iterate through all the notations
-    for notation in notation_list:
-        # Split the notation (e.g. e2e4 => e2, e4) into start and end position
-        first_part, second_part = notation[:len(notation) // 2], notation[len(notation) // 2:]
-        # Set the old and new position of the move
-        old_pos = not_to_pos(first_part)
-        new_pos = not_to_pos(second_part)
-        # Get the piece which moves
-        piece = state[old_pos[0]][old_pos[1]]
-        # Declare the move
-        move = Move(state, old_pos, new_pos)
-        # Append the move to return list
-        moves.append(move)
-        # Make the move
-        state[old_pos[0]][old_pos[1]] = 0
-        state[new_pos[0]][new_pos[1]] = piece
-    # Return the moves list
-    return moves
+                return move
+            window *= 4
 
+    # Searches the first node (the legal moves of the current position) to the depth with the window (a, b) and returns
+    # the best move; the score of the move is stored in self.root_score (good for the player to move if positive)
+    def search_root(self, depth, moves, board, a, b):
+        self.stats.nodes += 1
+        original_a = a
+        self.order_root_moves(moves, board)
+        best_score = -INFINITY
+        best_move = moves[0] if len(moves) > 0 else None
+        for i, move in enumerate(moves):
+            board.make_move(move)
+            score = self.search_child(depth - 1, board, a, b, 1, i == 0)
+            board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                a = max(a, score)
+                if a >= b:
+                    break
+        return self.finish_root_search(depth, board, best_move, best_score, original_a, b)
 
-# Transforms a simple notation of chess (e.g. e4) into a usable position
-def not_to_pos(notation):
-    # Dict for the translation of the column letter
-    letter_to_column = {
-        "a": 0,
-        "b": 1,
-        "c": 2,
-        "d": 3,
-        "e": 4,
-        "f": 5,
-        "g": 6,
-        "h": 7,
-    }
-    # Return the transformed position
-    return 8 - int(notation[1]), letter_to_column[notation[0]]
+    # Sorts the moves of the first node
+    def order_root_moves(self, moves, board):
+        # Sort the moves according to capture value and history (reverse = true, because captures should be looked at
+        # first)
+        if USE_MOVE_ORDERING:
+            moves.sort(key=self.sort_moves, reverse=True)
+        # The best move of an earlier iteration is looked at first
+        # (the move out of the list is used, the stored one could be from another position with the same key)
+        if USE_TRANSPOSITION_TABLE:
+            entry = self.transposition_table.probe(board.zobrist_key)
+            if entry is not None and entry[3] != 0 and Move(entry[3]) in moves:
+                moves.insert(0, moves.pop(moves.index(Move(entry[3]))))
+
+    # Stores the result of the search of the first node and returns the best move
+    # original_a, b: the window of the search
+    def finish_root_search(self, depth, board, best_move, best_score, original_a, b):
+        # Store the result (a score below the window is only an upper bound, a score above it a lower bound)
+        if USE_TRANSPOSITION_TABLE and best_move is not None:
+            bound = UPPER_BOUND if best_score <= original_a else LOWER_BOUND if best_score >= b else EXACT
+            self.transposition_table.store(board.zobrist_key, depth, best_score, bound, best_move.code)
+        self.root_score = best_score
+        return best_move
+
+    # Same as search_root, but the moves after the first one are searched by a pool of processes
+    # The first move is searched in this process, its score is the alpha of the other moves; every process raises the
+    # shared alpha when it finds a better move, so the moves which are searched later are cut off earlier
+    # The board is sent to the processes as a FEN (the processes keep their own transposition table, killers and
+    # history)
+    def parallel_search_root(self, depth, moves, board, a, b, processes):
+        self.stats.nodes += 1
+        original_a = a
+        self.order_root_moves(moves, board)
+        board.make_move(moves[0])
+        best_score = self.search_child(depth - 1, board, a, b, 1, True)
+        board.unmake_move()
+        best_move = moves[0]
+        a = max(a, best_score)
+        if a < b and len(moves) > 1:
+            pool = self.get_search_pool(processes)
+            self.shared_alpha.value = a
+            fen = board.to_fen()
+            tasks = [(type(board), fen, move.code, depth, b, self.search_deadline, self.search_number)
+                     for move in moves[1:]]
+            timed_out = False
+            for move_code, score, improved, stats in pool.imap_unordered(search_root_move, tasks):
+                self.stats.add(stats)
+                if score is None:
+                    timed_out = True
+                # A score which did not beat the alpha of its search is only an upper bound (fail low), even if it
+                # equals the best score
+                elif improved and score > best_score:
+                    best_score = score
+                    best_move = moves[moves.index(Move(move_code))]
+            # Wait for all processes before stopping, so no task of this search is left in the pool
+            if timed_out:
+                raise SearchTimeout()
+        return self.finish_root_search(depth, board, best_move, best_score, original_a, b)
+
+    # Returns the process pool of the parallel search (created once and kept between the searches)
+    def get_search_pool(self, processes):
+        if self.search_pool is None or self.search_pool_size != processes:
+            self.close_search_pool()
+            self.shared_alpha = Value('i', -INFINITY)
+            self.search_pool = Pool(processes, initializer=init_search_process, initargs=(self.shared_alpha,))
+            self.search_pool_size = processes
+        return self.search_pool
+
+    # Stops the processes of the parallel search
+    def close_search_pool(self):
+        if self.search_pool is not None:
+            self.search_pool.terminate()
+            self.search_pool.join()
+            self.search_pool = None
+
+    # Searches one move of the first node in a process of the pool
+    # Returns (move number, score or None if the time is over, the score beat the alpha the move was searched with,
+    # SearchStats of the search of the move)
+    def search_root_move(self, args):
+        board_class, fen, move_code, depth, b, self.search_deadline, number = args
+        # The first move of a new search in this process
+        if number != self.process_search_number:
+            self.prepare_search()
+            self.process_search_number = number
+        self.stats = SearchStats()
+        probes, hits = self.transposition_table.probes, self.transposition_table.hits
+        board = board_class.from_fen(fen)
+        board.make_move(Move(move_code))
+        a = self.shared_alpha.value
+        try:
+            # The move does not matter anymore if another move was already too good
+            score = self.search_child(depth - 1, board, a, b, 1, False) if a < b else -INFINITY
+        except SearchTimeout:
+            score = None
+        improved = score is not None and score > a
+        if improved:
+            with self.shared_alpha.get_lock():
+                if score > self.shared_alpha.value:
+                    self.shared_alpha.value = score
+        self.stats.tt_probes = self.transposition_table.probes - probes
+        self.stats.tt_hits = self.transposition_table.hits - hits
+        return move_code, score, improved, self.stats
+
+    # Searches the position after a move with the window (a, b) of the player who made the move and returns the score
+    # for this player (negamax: the score of the child node is negated)
+    # The first move gets the full window; with principal variation search every later move is only tested with a null
+    # window (can it be better than alpha?) and only searched again with the full window if it is
+    def search_child(self, depth, board, a, b, ply, is_first_move):
+        if is_first_move or not USE_PRINCIPAL_VARIATION_SEARCH:
+            return -self.negamax(depth, board, -b, -a, ply)
+        score = -self.negamax(depth, board, -a - 1, -a, ply)
+        if a < score < b:
+            score = -self.negamax(depth, board, -b, -a, ply)
+        return score
+
+    # Alpha beta search in negamax form: returns the value of the position for the player to move (the higher the
+    # better)
+    # a, b: the window (a score <= a is too bad to matter, a score >= b is too good, the other player avoids it)
+    # ply: number of moves from the first node; allow_null: false directly after a null move
+    def negamax(self, depth, board, a, b, ply, allow_null=True):
+        # Foreach time in this function the position counter increases, because its a new position
+        self.stats.nodes += 1
+        # Look at the clock (and the stop flag) from time to time and stop the search if the time is over
+        if self.search_deadline is not None and self.stats.nodes % TIME_CHECK_INTERVAL == 0 and (
+                self.stop_requested or time.time() > self.search_deadline):
+            raise SearchTimeout()
+        # Draw by the 50 move rule
+        if board.stalemate:
+            return 0
+        # At the end of a branch only the captures are searched further, so the position is quiet when it is evaluated
+        if depth <= 0:
+            if USE_QUIESCENCE:
+                return self.quiescence_search(board, a, b, ply)
+            # Get the legal moves to find checkmate and stalemate
+            board.get_legal_moves()
+            return get_static_score(board, ply)
+
+        original_a = a
+        # The move which was the best in an earlier search of this position
+        hash_move = None
+        # Look up the position in the transposition table
+        if USE_TRANSPOSITION_TABLE:
+            entry = self.transposition_table.probe(board.zobrist_key)
+            if entry is not None:
+                entry_depth, entry_score, entry_bound, hash_move_code = entry
+                if hash_move_code != 0:
+                    hash_move = Move(hash_move_code)
+                # The stored score can be used if the search was at least as deep
+                if entry_depth >= depth:
+                    entry_score = score_from_table(entry_score, ply)
+                    if entry_bound == EXACT or (entry_bound == LOWER_BOUND and entry_score >= b) or (
+                            entry_bound == UPPER_BOUND and entry_score <= a):
+                        return entry_score
+
+        # The king of the player to move is attacked (nothing is pruned or reduced then)
+        in_check = board.is_in_check()
+        # Value of the position without searching (only needed near the end of the branch and for the null move)
+        static_score = get_static_score(board, ply) if not in_check else -INFINITY
+
+        # Reverse futility pruning: near the end of the branch the position is so good that the other player would not
+        # allow it, even if it gets worse by a margin for every remaining ply
+        if USE_REVERSE_FUTILITY and not in_check and depth <= REVERSE_FUTILITY_MAX_DEPTH and abs(b) < MATE_BOUND and \
+                static_score - REVERSE_FUTILITY_MARGIN * depth >= b:
+            self.stats.pruning["reverse_futility_pruned"] += 1
+            return static_score - REVERSE_FUTILITY_MARGIN * depth
+
+        # Null move pruning: let the other player move twice; if the position is still too good (>= b), a real move
+        # would be even better, so the rest of the search is skipped
+        # Not in check (a null move would be illegal) and not without pieces (zugzwang: every move makes it worse)
+        if USE_NULL_MOVE and allow_null and not in_check and depth >= NULL_MOVE_MIN_DEPTH and static_score >= b and \
+                board.has_pieces():
+            self.stats.pruning["null_move_searched"] += 1
+            board.make_null_move()
+            score = -self.negamax(depth - 1 - NULL_MOVE_REDUCTION, board, -b, -b + 1, ply + 1, False)
+            board.unmake_null_move()
+            if score >= b:
+                # Do not return an unproven checkmate
+                if score >= MATE_BOUND:
+                    score = b
+                # In the end game zugzwang is more likely, so the cutoff is verified by a normal search with less depth
+                if board.phase > NULL_MOVE_VERIFICATION_PHASE or \
+                        self.negamax(depth - 1 - NULL_MOVE_REDUCTION, board, b - 1, b, ply, False) >= b:
+                    self.stats.pruning["null_move_cutoffs"] += 1
+                    return score
+
+        # Futility pruning: near the end of the branch a quiet move can not bring the score up to alpha if the position
+        # is worse than alpha by more than the margin of the depth
+        futile = USE_FUTILITY and not in_check and depth < len(FUTILITY_MARGINS) and abs(a) < MATE_BOUND and \
+            static_score + FUTILITY_MARGINS[depth] <= a
+
+        # Take the moves one by one from the move picker (the moves after a cutoff are never generated or sorted)
+        # Checkmate and stalemate are set after the last move was taken
+        killers = self.killer_moves.get(ply, ())
+        if USE_MOVE_ORDERING:
+            moves = pick_moves(board, hash_move, killers, self.history_table)
+        else:
+            moves = board.get_legal_moves()
+        best_score = -INFINITY
+        best_move = None
+        for move_number, move in enumerate(moves):
+            board.make_move(move)
+            # Number of plies the move is searched less deep
+            reduction = 0
+            # Only quiet moves which do not give check are pruned or reduced (never the first move)
+            if best_move is not None and not in_check and move.captured_piece == 0 and not move.en_passant_capture and \
+                    move.promotion_piece == 0 and (futile or (USE_LATE_MOVE_REDUCTIONS and depth >= LMR_MIN_DEPTH and
+                                                              move_number >= LMR_MIN_MOVES)) and not board.is_in_check():
+                if futile:
+                    self.stats.pruning["futility_pruned"] += 1
+                    board.unmake_move()
+                    continue
+                # Late move reductions: the moves at the end of the ordered list are rarely the best ones, so they are
+                # searched less deep (the killer moves are not reduced)
+                if move not in killers:
+                    reduction = LMR_REDUCTION if move_number < LMR_DEEP_MOVES else LMR_DEEP_REDUCTION
+                    reduction = min(reduction, depth - 1)
+            if reduction > 0:
+                self.stats.pruning["lmr_reduced"] += 1
+                score = -self.negamax(depth - 1 - reduction, board, -a - 1, -a, ply + 1)
+                # The reduced search says the move is better than alpha => search it again with the full depth
+                if score > a:
+                    self.stats.pruning["lmr_researched"] += 1
+                    score = self.search_child(depth - 1, board, a, b, ply + 1, False)
+            else:
+                score = self.search_child(depth - 1, board, a, b, ply + 1, best_move is None)
+            board.unmake_move()
+            if best_move is None or score > best_score:
+                best_score = score
+                best_move = move
+                a = max(a, score)
+                # If beta is lower than alpha the rest of the tree is not important anymore, because the other player
+                # would not allow this position
+                if a >= b:
+                    self.stats.cutoffs += 1
+                    if move_number == 0:
+                        self.stats.first_move_cutoffs += 1
+                    # Remember the quiet move which caused the cutoff (it is tried early in the other positions)
+                    if move.captured_piece == 0 and not move.en_passant_capture:
+                        self.store_cutoff_move(ply, move, depth)
+                    break
+
+        # No legal move => checkmate or stalemate
+        if best_move is None:
+            return get_static_score(board, ply)
+
+        # Store the result (a score below the window is only an upper bound, a score above it a lower bound)
+        if USE_TRANSPOSITION_TABLE:
+            bound = UPPER_BOUND if best_score <= original_a else LOWER_BOUND if best_score >= b else EXACT
+            self.transposition_table.store(board.zobrist_key, depth, score_to_table(best_score, ply), bound,
+                                           best_move.code)
+        return best_score
+
+    # Searches only the captures (and the quiet checks at the first ply if QUIESCENCE_CHECKS) until the position is
+    # quiet and returns its value for the player to move; a, b: the window like in negamax
+    # The player to move can always stop capturing and take the evaluation of the position (stand pat), unless the king
+    # is in check, then all moves are searched
+    def quiescence_search(self, board, a, b, ply, quiescence_ply=0):
+        self.stats.quiescence_nodes += 1
+        # Look at the clock (and the stop flag) from time to time and stop the search if the time is over
+        if self.search_deadline is not None and self.stats.quiescence_nodes % TIME_CHECK_INTERVAL == 0 and (
+                self.stop_requested or time.time() > self.search_deadline):
+            raise SearchTimeout()
+        # Draw by the 50 move rule
+        if board.stalemate:
+            return 0
+
+        # Get the captures as move numbers (this sets check as well)
+        moves = board.get_legal_move_codes(CAPTURE_MOVES)
+        if board.check:
+            # All moves to get out of the check (this sets checkmate if there are none)
+            moves = board.get_legal_move_codes()
+            if len(moves) == 0:
+                return get_static_score(board, ply)
+            stand_pat = None
+            best_score = -INFINITY
+        else:
+            stand_pat = get_static_score(board, ply)
+            # The player can keep the value of the position => check if this is already good enough for a cutoff
+            if stand_pat >= b:
+                return stand_pat
+            a = max(a, stand_pat)
+            best_score = stand_pat
+            # Quiet moves which give check
+            if QUIESCENCE_CHECKS and quiescence_ply == 0:
+                moves += [code for code in board.get_legal_move_codes(QUIET_MOVES) if gives_check(board, Move(code))]
+        # Captures by MVV-LVA
+        moves.sort(key=mvv_lva, reverse=True)
+
+        for code in moves:
+            # Delta pruning: skip the capture if even the captured piece (and the promotion) and a margin can not bring
+            # the score up to alpha
+            if stand_pat is not None and stand_pat + capture_value(code) + CAPTURE_VALUES[code >> 22 & 31] + \
+                    DELTA_MARGIN < a:
+                continue
+            board.make_move(Move(code))
+            score = -self.quiescence_search(board, -b, -a, ply + 1, quiescence_ply + 1)
+            board.unmake_move()
+            if score > best_score:
+                best_score = score
+                a = max(a, score)
+                if a >= b:
+                    break
+        return best_score
+
+    # Key function of move sorting (captures by MVV-LVA, quiet moves by the history table)
+    def sort_moves(self, move):
+        if move.captured_piece != 0 or move.en_passant_capture:
+            # Captures come before all quiet moves
+            return HISTORY_LIMIT + mvv_lva(move.code)
+        return self.history_table[history_index(move.code)]
+
+    # Remembers a quiet move which caused a beta cutoff at the depth: it becomes a killer move of the ply (number of
+    # moves from the first node) and its history score grows (deep cutoffs count more)
+    def store_cutoff_move(self, ply, move, depth):
+        killers = self.killer_moves.get(ply)
+        if killers is None:
+            self.killer_moves[ply] = [move, None]
+        elif killers[0] != move:
+            # The older killer moves to the second slot
+            killers[1] = killers[0]
+            killers[0] = move
+        index = history_index(move.code)
+        self.history_table[index] = min(self.history_table[index] + depth * depth, HISTORY_LIMIT)
+
+
+# The engine of find_best_move (None => created at the first use, so importing this module, e.g. in a process of the
+# parallel search, does not allocate a transposition table)
+default_engine = None
+# Only one thread creates the default engine
+default_engine_lock = threading.Lock()
+
+
+# Returns the engine of find_best_move
+def get_default_engine():
+    global default_engine
+    with default_engine_lock:
+        if default_engine is None:
+            default_engine = Engine()
+        return default_engine
+
+
+# Runs at the start of every process of the pool (every process searches with its own engine)
+def init_search_process(alpha):
+    global process_engine
+    process_engine = Engine()
+    process_engine.shared_alpha = alpha
+
+
+# Searches one move of the first node in a process of the pool (see Engine.search_root_move)
+def search_root_move(args):
+    return process_engine.search_root_move(args)
+
+
+# Returns the value of the position for the player to move
+# (a checkmate is worth less the more moves it takes, so the shortest checkmate is played)
+def get_static_score(board, ply):
+    if board.checkmate:
+        return -(MATE_SCORE - ply)
+    if board.stalemate:
+        return 0
+    return evaluate(board) if board.white_move else -evaluate(board)
+
+
+# Checkmate scores are stored in the transposition table as the distance from the position instead of the distance
+# from the first node (the position can be reached at another ply)
+def score_to_table(score, ply):
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+# Returns the score of the transposition table as seen from the first node
+def score_from_table(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+# Takes back the moves and null moves of an unfinished search until the move history has the length root_length
+def take_back_search_moves(board, root_length):
+    while len(board.move_history) > root_length or len(board.null_move_stack) > 0:
+        # The null move was made after the last move of the history => take it back first
+        if len(board.null_move_stack) > 0 and board.null_move_stack[-1][4] == len(board.move_history):
+            board.unmake_null_move()
+        else:
+            board.unmake_move()
+
+
+# Check if the move gives check to the other player
+def gives_check(board, move):
+    board.make_move(move)
+    check = board.is_in_check()
+    board.unmake_move()
+    return check
 
 
 # Transforms a usable position into a simple notation of chess (e.g. e4)
@@ -355,9 +838,12 @@ def pos_to_not(pos):
     return letter_to_column[pos[1]] + str(8 - pos[0])
 
 
-# Transforms a move into a notation (e.g. e2e4)
+# Transforms a move into a notation (e.g. e2e4; a promotion gets the letter of the new piece, e.g. e7e8q)
 def move_to_notation(move):
-    return str(pos_to_not(move.old_pos)) + str(pos_to_not(move.new_pos))
+    notation = str(pos_to_not(move.old_pos)) + str(pos_to_not(move.new_pos))
+    if move.promotion:
+        notation += "nbrq"[move.promotion_piece % 10 - 2]
+    return notation
 
 
 # Own Monte Carlo Tree Search
@@ -377,153 +863,120 @@ def train_monte_carlo_tree(board, screen, clock, show=False):
     saving_rate = 50
     # Iteration counter (for debug purposes)
     counter = 1
+    # Load the tree
+    tree = load_monte_carlo_tree()
     # Iterate through the saving iterations
     for i in range(int(training_cycles / saving_rate)):
-        # Open the file
-        with open("mcts1.json", "r") as file:
-            # Load the tree
-            tree = json.load(file)
-            # Iterate through training
-            for j in range(saving_rate):
-                # Select the best node (based on ucb value)
-                node = selection(tree["start"], board, screen, clock, show)
-                print("Selection completed")
-                # Get the new expanded child
-                child_index = expansion(node, board)
-                print("Expansion completed")
-                new_node = node["children"][child_index]
-                # Simulate and get the result of the game
-                result = simulation(board, screen, clock, show)
-                print("Simulation completed")
-                # Update the parent values and win rates
-                backpropagation(result, tree["start"], new_node)
-                print("Backpropagation completed")
-                # Reset the board
-                board.reset_board()
-                # Update the counter
-                print(str(counter) + "/" + str(training_cycles))
-                counter += 1
+        # Iterate through training
+        for j in range(saving_rate):
+            # Select the best node (based on ucb value)
+            node = selection(tree, board, screen, clock, show)
+            print("Selection completed")
+            # Get the new expanded child (the board is in its position afterwards)
+            node = expansion(tree, node, board, screen, clock, show)
+            print("Expansion completed")
+            # The player to move in the position of the new node
+            white_move = board.white_move
+            # Simulate and get the result of the game
+            result = simulation(board, screen, clock, show)
+            print("Simulation completed")
+            # Update the visits and win rates of the new node and the nodes above it
+            backpropagation(tree, node, result, white_move)
+            print("Backpropagation completed")
+            # Reset the board
+            board.reset_board()
+            # Update the counter
+            print(str(counter) + "/" + str(training_cycles))
+            counter += 1
         # Save the file
-        with open("mcts1.json", "w") as file:
-            json.dump(tree, file, indent=8)
+        tree.save(MCTS_FILE)
         print("SAVED")
 
     # DEBUG the first moves and their visits
     most_explored = float("-inf")
     highest_win_rate = float("-inf")
     move_with_best_win_rate = None
-    for child in tree["start"]["children"]:
-        if child["visits"] > most_explored:
-            most_explored = child["visits"]
-        if (child["win"] / child["visits"]) > highest_win_rate:
-            highest_win_rate = (child["win"] / child["visits"])
+    for child in tree.get_children(ROOT):
+        if tree.visits[child] > most_explored:
+            most_explored = tree.visits[child]
+        if tree.visits[child] > 0 and (tree.wins[child] / tree.visits[child]) > highest_win_rate:
+            highest_win_rate = (tree.wins[child] / tree.visits[child])
             move_with_best_win_rate = child
 
-        print(str(child["move_history"]) + ": " + str(child["visits"]))
+        print(move_to_notation(Move(tree.move[child])) + ": " + str(tree.visits[child]))
     print("most explored node was visited: " + str(most_explored) + " times")
-    print("Highest win rate is " + str(highest_win_rate) + " at move " + str(move_with_best_win_rate["move_history"]))
+    if move_with_best_win_rate is not None:
+        print("Highest win rate is " + str(highest_win_rate) + " at move " +
+              move_to_notation(Move(tree.move[move_with_best_win_rate])))
 
 
-# Takes a node and returns its ucb value
-# The value which decides how likely a node is visited next
-def ucb_val(node):
-    # First part: win rate + 10^-6 so there is no division error, when the node has not been visited yet => Exploitation
-    # Second part: the rate how often the node is visited compared to its parent => Exploration
-    # 1.4 = exploration rate (the higher the value is, the more is going to be explored)
-    return (node["win"] / (node["visits"] + (10 ** -6))) + (1.4 * math.sqrt(
-        math.log(node["parent_visits"] + 10 ** -6) / (node["visits"] + (10 ** -10))))
+# Returns the trained tree (of MCTS_FILE, converted out of the old MCTS_JSON_FILE or a new tree)
+def load_monte_carlo_tree():
+    if os.path.exists(MCTS_FILE):
+        return MonteCarloTree.load(MCTS_FILE)
+    try:
+        with open(MCTS_JSON_FILE, "r") as file:
+            return MonteCarloTree.from_dict(json.load(file)["start"])
+    except (OSError, ValueError, KeyError):
+        # There is no old tree (or it can not be read)
+        return MonteCarloTree()
 
 
-# Takes a node and goes down the children (selects the best ucb val)
-def selection(node, board, screen, clock, show):
-    # Get the legal moves in current game state
-    legal_moves = board.get_legal_moves()
-    # Check if the node is not the first (there would not be any move to make)
-    if len(node["move_history"]) != 0:
-        # Get the move of the node
-        move = notation_list_to_moves(node["move_history"])[-1]
-        # Iterate through the legal moves
-        for legal_move in legal_moves:
-            # Check if the move is a legal move
-            if move == legal_move:
-                print("made move " + str(move_to_notation(legal_move)))
-                # The legal move is made, because it has extra properties (e.g. pawn promotion or castling)
-                # while the move converted from notation is a simple move without special booleans
-                board.make_move(legal_move)
-                # Check if the move should be displayed
-                if show:
-                    # Display the board based on the state, selected position and highlighted squares
-                    display_board(board, screen, (), [])
-                    # Pygame refresh
-                    p.display.flip()
-                    clock.tick(30)
-    # Get new legal moves (the state changed)
-    legal_moves = board.get_legal_moves()
-    # Check if the current node has every possible child => if not then we stop the selection and expand
-    if len(node["children"]) < len(legal_moves):
-        print("Legal moves: " + str([move_to_notation(move) for move in legal_moves]))
-        print("Length of children: " + str(len(node["children"])))
-        print("Found something unexplored")
-        return node
+# Goes down the children from the root (selects the best ucb val) until a node which is not fully expanded
+# The moves of the nodes are made on the board (starting at the position of the root)
+def selection(tree, board, screen, clock, show):
+    node = ROOT
+    while tree.is_fully_expanded(node):
+        # Get the child with the best ucb
+        # Initially the max ucb is -infinity so there will be a node which is higher
+        max_ucb = float("-inf")
+        # Keeps track of the best child
+        best_child = None
+        # Iterate through all the children of the current node
+        for child in tree.get_children(node):
+            # Get the ucb value of the current child
+            current_ucb = tree.ucb_value(child)
+            # Check if there is a new best child
+            if current_ucb > max_ucb:
+                # If so, update the max ucb and the best child
+                max_ucb = current_ucb
+                best_child = child
+        node = best_child
+        # The number of the node is the number of the legal move, so it has all its properties (e.g. promotion)
+        board.make_move(Move(tree.move[node]))
+        # Check if the move should be displayed
+        if show:
+            # Display the board based on the state, selected position and highlighted squares
+            display_board(board, screen, (), [])
+            # Pygame refresh
+            p.display.flip()
+            clock.tick(30)
+    return node
+
 
-    # Get the child with the best ucb
-    # Initially the max ucb is -infinity so there will be a node which is higher
-    max_ucb = float("-inf")
-    # Keeps track of the best child
-    best_child = None
-    # Iterate through all the children of the current node
-    for child in node["children"]:
-        # Get the ucb value of the current child
-        current_ucb = ucb_val(child)
-        # Check if there is a new best child
-        if current_ucb > max_ucb:
-            # If so, update the max ucb and the best child
-            max_ucb = current_ucb
-            best_child = child
-
-    # Recursion until the case above
-    return selection(best_child, board, screen, clock, show)
-
-
-# Expand a new child node to the node passed in, after the selection
-def expansion(node, board):
+# Expand a new child node to the node passed in, after the selection, and make its move on the board
+# Returns the new child (or the node itself, if the game ended in its position)
+def expansion(tree, node, board, screen, clock, show):
     # Get the legal moves
     legal_moves = board.get_legal_moves()
-    # Keeps track of the already expanded moves from node (in Move format)
-    expanded_moves = []
-    # Keeps track of the unexpanded moves from node (in Move format)
-    unexpanded_moves = []
-    # Iterate through all the children from node
-    for child in node["children"]:
-        # Append the move conversion to the expanded moves
-        expanded_moves.append(notation_list_to_moves(child["move_history"])[-1])
-    # Iterate through the legal moves
-    for move in legal_moves:
-        # Check if the move is already in the expanded moves
-        if move not in expanded_moves:
-            # Append it to the unexpanded moves if not
-            unexpanded_moves.append(move)
-
-    print("Unexpanded moves " + str([move_to_notation(m) for m in unexpanded_moves]))
+    tree.legal_count[node] = len(legal_moves)
+    # The moves which have no child yet
+    unexpanded_moves = [move for move in legal_moves if tree.get_child(node, move) == NO_NODE]
+    # The game ended (checkmate or stalemate), so the node is simulated again
+    if len(unexpanded_moves) == 0:
+        return node
     # Take a random unexpanded move to expand it
     random_expansion_move = find_random_move(unexpanded_moves)
-
-    # Check if something went wrong
-    if random_expansion_move is None:
-        raise Exception("Random expansion move is None")
-
+    board.make_move(random_expansion_move)
+    # Check if the move should be displayed
+    if show:
+        # Display the board based on the state, selected position and highlighted squares
+        display_board(board, screen, (), [])
+        # Pygame refresh
+        p.display.flip()
+        clock.tick(30)
     # Append the new node to the children of the old node
-    node["children"].append({
-        "move_history": node["move_history"] + [move_to_notation(random_expansion_move)],
-        "parent_visits": node["visits"],
-        "visits": 0,
-        "win": 0,
-        "children": [
-        ]
-    })
-
-    # Return the index of the new child node
-    return len(node["children"]) - 1
+    return tree.add_node(node, random_expansion_move.code)
 
 
 # Simulate to end of the game
@@ -565,40 +1018,8 @@ def simulation(board, screen, clock, show):
 
 
 # Update the values in the tree based on the result
-# label_node : basically the first node in the tree
-# simulated_node : the node form which the game was simulated
+# node : the node from which the game was simulated
 # result : number contains information how the simulation ended
-def backpropagation(result, label_node, simulated_node):
-    # Set the current node for iterative purposes
-    current_node = label_node
-    # Keeps track of the current player
-    whites_turn = True
-    # Iterate down the tree until we reach the simulated node
-    while current_node["move_history"] != simulated_node["move_history"]:
-        # Update the values of the current node
-        current_node["visits"] += 1
-        if result == 0:
-            current_node["win"] += 0.5
-        elif result == 1:
-            current_node["win"] += 1 if whites_turn else 0
-        else:
-            current_node["win"] += 1 if not whites_turn else 0
-        # Update the player
-        whites_turn = not whites_turn
-        # Iterate through all the children of the current node to find the correct path to the simulated node
-        for child in current_node["children"]:
-            # Update the child parent visits
-            child["parent_visits"] += 1
-            # Check if the child is the next in the correct path
-            if child["move_history"] == simulated_node["move_history"][:len(child["move_history"])]:
-                # If so, set the current node
-                current_node = child
-
-    # Update the values of the simulated / current node
-    current_node["visits"] += 1
-    if result == 0:
-        current_node["win"] += 0.5
-    elif result == 1:
-        current_node["win"] += 1 if whites_turn else 0
-    else:
-        current_node["win"] += 1 if not whites_turn else 0
+# white_move : white was to move in the position of the node
+def backpropagation(tree, node, result, white_move):
+    tree.backpropagate(node, result, white_move)
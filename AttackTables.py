@@ -0,0 +1,184 @@
+# A square is stored as one number: row * 8 + column (0 = a8, 63 = h1), so it matches the rows of Board.state
+# The bit of a square in a bitboard is 1 << square
+
+# All directions (row, col): 0-3 = Rook Directions; 4-7 = Bishop Directions
+DIRECTIONS = ((-1, 0), (0, 1), (0, -1), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1))
+ROOK_DIRECTIONS = (0, 1, 2, 3)
+BISHOP_DIRECTIONS = (4, 5, 6, 7)
+QUEEN_DIRECTIONS = (0, 1, 2, 3, 4, 5, 6, 7)
+
+
+# Returns the bitboard of all the squares which can be reached from the square with the given steps (one step each)
+def step_attacks(sq, steps):
+    attacks = 0
+    for step in steps:
+        r = sq // 8 + step[0]
+        c = sq % 8 + step[1]
+        # Check if the square is still on the board
+        if 0 <= r < 8 and 0 <= c < 8:
+            attacks |= 1 << (r * 8 + c)
+    return attacks
+
+
+# Returns the bitboard of all the squares in direction d from the square (the square itself is not included)
+def ray(sq, d):
+    squares = 0
+    r = sq // 8 + d[0]
+    c = sq % 8 + d[1]
+    # Go in the direction until we are off the board
+    while 0 <= r < 8 and 0 <= c < 8:
+        squares |= 1 << (r * 8 + c)
+        r += d[0]
+        c += d[1]
+    return squares
+
+
+# Attack tables as bitboards (used by BitBoard)
+# Squares a knight on a square attacks
+KNIGHT_ATTACKS = [step_attacks(sq, ((-1, -2), (-2, -1), (-2, 1), (-1, 2), (1, -2), (2, -1), (2, 1), (1, 2)))
+                  for sq in range(64)]
+# Squares a king on a square attacks
+KING_ATTACKS = [step_attacks(sq, DIRECTIONS) for sq in range(64)]
+# Squares a pawn on a square attacks ([0]: white pawn moving up; [1]: black pawn moving down)
+PAWN_ATTACKS = [[step_attacks(sq, ((-1, -1), (-1, 1))) for sq in range(64)],
+                [step_attacks(sq, ((1, -1), (1, 1))) for sq in range(64)]]
+# Rays of every direction from every square: RAYS[direction][square]
+RAYS = [[ray(sq, d) for sq in range(64)] for d in DIRECTIONS]
+# True if the direction goes to higher squares => the nearest blocker is the lowest bit, else the highest bit
+POSITIVE_DIRECTION = [d[0] * 8 + d[1] > 0 for d in DIRECTIONS]
+
+
+# Returns the squares between two squares if they are on one line (both squares excluded), else 0
+def between(sq1, sq2):
+    for d in range(8):
+        if RAYS[d][sq1] >> sq2 & 1:
+            return RAYS[d][sq1] & ~RAYS[d][sq2] & ~(1 << sq2)
+    return 0
+
+
+# Returns the whole line (edge to edge) through two squares if they are on one line, else 0
+def line(sq1, sq2):
+    for d in range(8):
+        if RAYS[d][sq1] >> sq2 & 1:
+            # The opposite direction has the index of the direction with the inverted (row, col)
+            opposite = DIRECTIONS.index((-DIRECTIONS[d][0], -DIRECTIONS[d][1]))
+            return RAYS[d][sq1] | RAYS[opposite][sq1] | (1 << sq1)
+    return 0
+
+
+# Squares between every pair of squares: BETWEEN[square1][square2]
+BETWEEN = [[between(sq1, sq2) for sq2 in range(64)] for sq1 in range(64)]
+# Lines through every pair of squares: LINE[square1][square2]
+LINE = [[line(sq1, sq2) for sq2 in range(64)] for sq1 in range(64)]
+
+
+# The rays of a square used by the sliders: (ray, True if direction is positive, rays of the direction)
+ROOK_RAYS = [[(RAYS[d][sq], POSITIVE_DIRECTION[d], RAYS[d]) for d in ROOK_DIRECTIONS] for sq in range(64)]
+BISHOP_RAYS = [[(RAYS[d][sq], POSITIVE_DIRECTION[d], RAYS[d]) for d in BISHOP_DIRECTIONS] for sq in range(64)]
+
+# Masks of the board edges and the rows the pawns land on after one step from their start row
+FULL_BOARD = (1 << 64) - 1
+COLUMN_A = sum(1 << (r * 8) for r in range(8))
+COLUMN_H = COLUMN_A << 7
+ROW_3 = 0xFF << 40
+ROW_6 = 0xFF << 16
+
+
+# Returns the squares a slider attacks along the rays (of ROOK_RAYS or BISHOP_RAYS), with the pieces in occupied
+# blocking the way
+def slider_attacks(rays, occupied):
+    attacks = 0
+    for squares, positive, direction_rays in rays:
+        blockers = squares & occupied
+        if blockers:
+            # Find the nearest blocker and cut off the ray behind it
+            if positive:
+                squares ^= direction_rays[(blockers & -blockers).bit_length() - 1]
+            else:
+                squares ^= direction_rays[blockers.bit_length() - 1]
+        attacks |= squares
+    return attacks
+
+
+# Squares a rook or bishop on a square would attack on an empty board (used to find pinning pieces)
+ROOK_SCOPE = [slider_attacks(ROOK_RAYS[sq], 0) for sq in range(64)]
+BISHOP_SCOPE = [slider_attacks(BISHOP_RAYS[sq], 0) for sq in range(64)]
+
+
+# Returns the squares of the rays without the last square of every ray (a piece on the edge of the board blocks
+# nothing, so only the pieces on these squares change the attacks)
+def inner_squares(rays):
+    mask = 0
+    for squares, positive, direction_rays in rays:
+        if squares:
+            # The last square is the highest bit in a positive direction, else the lowest bit
+            mask |= squares ^ (1 << squares.bit_length() - 1 if positive else squares & -squares)
+    return mask
+
+
+ROOK_MASKS = [inner_squares(ROOK_RAYS[sq]) for sq in range(64)]
+BISHOP_MASKS = [inner_squares(BISHOP_RAYS[sq]) for sq in range(64)]
+# The attacks of the sliders for every square: {blockers (occupied & mask): attacked squares}
+# The entries are calculated the first time the blockers are seen (there are at most 4096 per square), so a lookup
+# replaces the loop over the rays of slider_attacks
+ROOK_ATTACKS = [{} for sq in range(64)]
+BISHOP_ATTACKS = [{} for sq in range(64)]
+
+
+# Returns the squares a rook on the square attacks with the pieces in occupied blocking the way
+def rook_attacks(sq, occupied):
+    blockers = occupied & ROOK_MASKS[sq]
+    attacks = ROOK_ATTACKS[sq].get(blockers)
+    if attacks is None:
+        attacks = ROOK_ATTACKS[sq][blockers] = slider_attacks(ROOK_RAYS[sq], blockers)
+    return attacks
+
+
+# Returns the squares a bishop on the square attacks with the pieces in occupied blocking the way
+def bishop_attacks(sq, occupied):
+    blockers = occupied & BISHOP_MASKS[sq]
+    attacks = BISHOP_ATTACKS[sq].get(blockers)
+    if attacks is None:
+        attacks = BISHOP_ATTACKS[sq][blockers] = slider_attacks(BISHOP_RAYS[sq], blockers)
+    return attacks
+
+
+# Returns the squares a queen on the square attacks (a queen moves like a rook and a bishop)
+def queen_attacks(sq, occupied):
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+# Tables for the nested list board (Board): the squares as (row, col)
+
+# Returns the squares (row, col) in direction d from the square, ordered by the distance
+def ray_squares(sq, d):
+    return tuple((sq // 8 + d[0] * i, sq % 8 + d[1] * i) for i in range(1, 8)
+                 if 0 <= sq // 8 + d[0] * i < 8 and 0 <= sq % 8 + d[1] * i < 8)
+
+
+# The squares of every direction from every square: RAY_SQUARES[square][direction]
+RAY_SQUARES = [[ray_squares(sq, d) for d in DIRECTIONS] for sq in range(64)]
+# All the moves a knight can make (row, col)
+KNIGHT_STEPS = ((-1, -2), (-2, -1), (-2, 1), (-1, 2), (1, -2), (2, -1), (2, 1), (1, 2))
+# The squares a knight on a square attacks: (row, col, row step, col step)
+KNIGHT_SQUARES = [tuple((sq // 8 + m[0], sq % 8 + m[1], m[0], m[1]) for m in KNIGHT_STEPS
+                        if 0 <= sq // 8 + m[0] < 8 and 0 <= sq % 8 + m[1] < 8) for sq in range(64)]
+# The squares a king on a square attacks: (row, col)
+KING_SQUARES = [tuple(squares[0] for squares in RAY_SQUARES[sq] if squares) for sq in range(64)]
+# The pieces (both colors) which attack a square from a direction (index of DIRECTIONS) if they are on the next square
+# Rooks and queens in rook directions, bishops and queens in bishop directions, kings and the pawns which attack
+# towards the square (a white pawn attacks upwards => it is below the square)
+NEAR_ATTACKERS = [frozenset((4, 14, 5, 15, 6, 16)), frozenset((4, 14, 5, 15, 6, 16)),
+                  frozenset((4, 14, 5, 15, 6, 16)), frozenset((4, 14, 5, 15, 6, 16)),
+                  frozenset((3, 13, 5, 15, 6, 16, 11)), frozenset((3, 13, 5, 15, 6, 16, 11)),
+                  frozenset((3, 13, 5, 15, 6, 16, 1)), frozenset((3, 13, 5, 15, 6, 16, 1))]
+# The pieces which attack a square from a direction if they are further away (only sliders)
+FAR_ATTACKERS = [frozenset((4, 14, 5, 15))] * 4 + [frozenset((3, 13, 5, 15))] * 4
+
+
+# Yields the square of every set bit of a bitboard
+def squares_of(bitboard):
+    while bitboard:
+        low_bit = bitboard & -bitboard
+        yield low_bit.bit_length() - 1
+        bitboard ^= low_bit
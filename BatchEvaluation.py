@@ -0,0 +1,105 @@
+import random
+import sys
+import time
+import numpy as np
+from Board import Board
+from Evaluation import MG_SCORES, EG_SCORES, PHASE_WEIGHTS, MAX_PHASE, CASTLED_BONUS
+from Evaluation import evaluate
+
+# The evaluation tables as arrays: [piece, square]
+MG_TABLE = np.array(MG_SCORES, dtype=np.int32)
+EG_TABLE = np.array(EG_SCORES, dtype=np.int32)
+PHASE_TABLE = np.array(PHASE_WEIGHTS, dtype=np.int32)
+# The square numbers 0 - 63 (used to look up the value of every square at once)
+SQUARES = np.arange(64)
+
+
+# Returns the pieces of the boards as an (N, 64) array (row n: the piece numbers of board n by square row * 8 + col)
+def encode_boards(boards):
+    pieces = np.empty((len(boards), 64), dtype=np.int8)
+    for i, board in enumerate(boards):
+        pieces[i] = [piece for row in board.state for piece in row]
+    return pieces
+
+
+# Returns the scores of (N, 64) encoded positions (negative is good for black and positive is good for white)
+# w_castled, b_castled: optional arrays of N booleans (castling bonus like evaluate)
+def evaluate_encoded(pieces, w_castled=None, b_castled=None):
+    pieces = pieces.astype(np.intp)
+    # Look up the value of every square and add the squares of every position
+    mg_scores = MG_TABLE[pieces, SQUARES].sum(axis=1, dtype=np.int64)
+    eg_scores = EG_TABLE[pieces, SQUARES].sum(axis=1, dtype=np.int64)
+    phases = np.minimum(PHASE_TABLE[pieces].sum(axis=1), MAX_PHASE)
+    # Mix the middle game and the end game score by the phase (the same way as evaluate)
+    scores = (mg_scores * phases + eg_scores * (MAX_PHASE - phases)) // MAX_PHASE
+    if w_castled is not None:
+        scores += np.asarray(w_castled, dtype=np.int64) * CASTLED_BONUS
+    if b_castled is not None:
+        scores -= np.asarray(b_castled, dtype=np.int64) * CASTLED_BONUS
+    return scores.astype(np.float64)
+
+
+# Returns the scores of the boards from the view of white as an array (the same values as Evaluation.evaluate for
+# every board, checkmate is worth infinity or -infinity)
+def evaluate_boards(boards):
+    scores = evaluate_encoded(encode_boards(boards),
+                              [board.w_castled for board in boards], [board.b_castled for board in boards])
+    # Checkmate is worth infinity or -infinity and stalemate 0
+    for i, board in enumerate(boards):
+        if board.checkmate:
+            scores[i] = float("-inf") if board.white_move else float("inf")
+        elif board.stalemate:
+            scores[i] = 0
+    return scores
+
+
+# Creates positions by playing random moves from the start
+def random_positions(count, max_plies=80, seed=0):
+    rand = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = Board()
+        for ply in range(rand.randint(0, max_plies)):
+            moves = board.get_legal_moves()
+            if len(moves) == 0 or board.stalemate:
+                break
+            board.make_move(rand.choice(moves))
+        boards.append(board)
+    return boards
+
+
+# Compares the time of the batch evaluation with the scalar evaluation of the same positions
+# (scalar from scratch: the terms are calculated from the squares; scalar incremental: the terms of the board are used)
+def benchmark(count=10000):
+    boards = random_positions(count)
+
+    start = time.time()
+    pieces = encode_boards(boards)
+    encode_time = time.time() - start
+    w_castled = [board.w_castled for board in boards]
+    b_castled = [board.b_castled for board in boards]
+    start = time.time()
+    batch_scores = evaluate_encoded(pieces, w_castled, b_castled)
+    batch_time = time.time() - start
+
+    start = time.time()
+    scratch_scores = []
+    for board in boards:
+        board.mg_score, board.eg_score, board.phase = board.calculate_evaluation_terms()
+        scratch_scores.append(evaluate(board))
+    scratch_time = time.time() - start
+
+    start = time.time()
+    incremental_scores = [evaluate(board) for board in boards]
+    incremental_time = time.time() - start
+
+    print("positions", count)
+    print("batch (encoded)", round(batch_time, 4), "s", "+ encoding", round(encode_time, 4), "s")
+    print("scalar from scratch", round(scratch_time, 4), "s")
+    print("scalar incremental", round(incremental_time, 4), "s")
+    print("same scores", list(batch_scores) == scratch_scores == incremental_scores)
+
+
+# Usage: python BatchEvaluation.py [number of positions]
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,410 @@
+from Board import Board
+from Board import Move
+from Board import ZOBRIST_PIECES, ZOBRIST_BLACK_MOVE, SQUARE_POS
+from Evaluation import MG_SCORES, EG_SCORES, PHASE_WEIGHTS
+from Board import EN_PASSANT_FLAG, CASTLE_FLAG, ALL_MOVES, CAPTURE_MOVES, QUIET_MOVES
+from AttackTables import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, LINE, ROOK_SCOPE, BISHOP_SCOPE, \
+    FULL_BOARD, COLUMN_A, COLUMN_H, ROW_3, ROW_6, rook_attacks, bishop_attacks, queen_attacks, squares_of
+
+
+# The board with a bitboard for every piece type and color (one number with a bit for every occupied square)
+# It has the same interface as Board; the position is stored in the bitboards and in squares (the piece on every
+# square), the nested lists of Board.state are only built when they are read (e.g. to draw the board)
+class BitBoard(Board):
+    # Initialize the board
+    def __init__(self):
+        # The nested lists of the pieces (None => built from squares when state is read next time)
+        self.nested_state = None
+        super().__init__()
+        # The bitboards of the pieces (indexed by the piece number 1-6 and 11-16)
+        self.bitboards = [0] * 17
+        # The occupied squares by color ([0]: white; [1]: black)
+        self.occupancy = [0, 0]
+        # The piece on every square (row * 8 + column; 0 => empty)
+        self.squares = [0] * 64
+        # Fill the bitboards from the state
+        self.load_bitboards()
+
+    # The pieces as nested lists like Board.state (a copy of squares, so a change of it has to be followed by
+    # load_bitboards)
+    @property
+    def state(self):
+        if self.nested_state is None:
+            squares = self.squares
+            self.nested_state = [squares[row * 8:row * 8 + 8] for row in range(8)]
+        return self.nested_state
+
+    @state.setter
+    def state(self, state):
+        self.nested_state = state
+
+    # Calculates the squares and all bitboards from the state
+    def load_bitboards(self):
+        self.squares = [piece for row in self.state for piece in row]
+        self.bitboards = [0] * 17
+        self.occupancy = [0, 0]
+        for sq in range(64):
+            piece = self.squares[sq]
+            if piece != 0:
+                self.bitboards[piece] |= 1 << sq
+                self.occupancy[piece > 10] |= 1 << sq
+
+    # Reset the board
+    def reset_board(self):
+        super().reset_board()
+        self.load_bitboards()
+
+    # Sets up the position of a FEN string
+    def load_fen(self, fen):
+        super().load_fen(fen)
+        self.load_bitboards()
+
+    # Makes a move (like Board.make_move; the moved and the captured piece are updated on the bitboards at once,
+    # put_piece is only used by the special moves)
+    def make_move(self, move, undo=False):
+        # Take back the last move if undo
+        if undo:
+            self.unmake_move()
+            return
+        self.save_undo_state()
+        self.move_history.append(move)
+
+        code = move.code
+        old_sq = code & 63
+        new_sq = code >> 6 & 63
+        piece = code >> 12 & 31
+        captured = code >> 17 & 31
+
+        # Captures and pawn moves reset the halfmove clock
+        if captured or piece == 1 or piece == 11:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        # The hash of the old castling rights and en passant square (replaced after the move)
+        rights_key = self.zobrist_rights_key()
+        self.update_castling_rights(move)
+        if piece == 6:
+            self.w_king_pos = SQUARE_POS[new_sq]
+        elif piece == 16:
+            self.b_king_pos = SQUARE_POS[new_sq]
+
+        # Move the piece and remove the captured piece
+        from_to = 1 << old_sq | 1 << new_sq
+        self.bitboards[piece] ^= from_to
+        self.occupancy[piece > 10] ^= from_to
+        if captured:
+            self.bitboards[captured] ^= 1 << new_sq
+            self.occupancy[captured > 10] ^= 1 << new_sq
+        self.squares[old_sq] = 0
+        self.squares[new_sq] = piece
+        self.nested_state = None
+        self.zobrist_key ^= ZOBRIST_PIECES[piece][old_sq] ^ ZOBRIST_PIECES[piece][new_sq] ^ \
+            ZOBRIST_PIECES[captured][new_sq] ^ rights_key
+        self.mg_score += MG_SCORES[piece][new_sq] - MG_SCORES[piece][old_sq] - MG_SCORES[captured][new_sq]
+        self.eg_score += EG_SCORES[piece][new_sq] - EG_SCORES[piece][old_sq] - EG_SCORES[captured][new_sq]
+        self.phase -= PHASE_WEIGHTS[captured]
+
+        # Promotion, en passant, castling and the new en passant square
+        self.make_special_move(move)
+
+        self.white_move = not self.white_move
+        self.zobrist_key ^= self.zobrist_rights_key() ^ ZOBRIST_BLACK_MOVE
+        self.check_draw()
+
+    # Takes back the last move (like Board.unmake_move)
+    def unmake_move(self):
+        code = self.move_history[-1].code
+        # Promotions, en passant captures and castling change more squares (taken back by put_piece)
+        if code >> 22:
+            super().unmake_move()
+            return
+        self.move_history.pop()
+        old_sq = code & 63
+        new_sq = code >> 6 & 63
+        piece = code >> 12 & 31
+        captured = code >> 17 & 31
+        self.white_move = not self.white_move
+
+        # Move the piece back and put the captured piece back
+        from_to = 1 << old_sq | 1 << new_sq
+        self.bitboards[piece] ^= from_to
+        self.occupancy[piece > 10] ^= from_to
+        if captured:
+            self.bitboards[captured] ^= 1 << new_sq
+            self.occupancy[captured > 10] ^= 1 << new_sq
+        self.squares[old_sq] = piece
+        self.squares[new_sq] = captured
+        self.nested_state = None
+        self.mg_score -= MG_SCORES[piece][new_sq] - MG_SCORES[piece][old_sq] - MG_SCORES[captured][new_sq]
+        self.eg_score -= EG_SCORES[piece][new_sq] - EG_SCORES[piece][old_sq] - EG_SCORES[captured][new_sq]
+        self.phase += PHASE_WEIGHTS[captured]
+
+        # Restore everything else (including the hash)
+        self.restore_undo_state(self.undo_stack[len(self.move_history)])
+
+    # Puts a piece (0 => empty) on the square (row, col) and updates the bitboards
+    def put_piece(self, row, col, piece):
+        sq = row * 8 + col
+        bit = 1 << sq
+        # Remove the piece which was on the square
+        old_piece = self.squares[sq]
+        if old_piece != 0:
+            self.bitboards[old_piece] ^= bit
+            self.occupancy[old_piece > 10] ^= bit
+        # Place the new piece
+        if piece != 0:
+            self.bitboards[piece] |= bit
+            self.occupancy[piece > 10] |= bit
+        # Update the hash, the evaluation terms and the squares
+        self.zobrist_key ^= ZOBRIST_PIECES[old_piece][sq] ^ ZOBRIST_PIECES[piece][sq]
+        self.mg_score += MG_SCORES[piece][sq] - MG_SCORES[old_piece][sq]
+        self.eg_score += EG_SCORES[piece][sq] - EG_SCORES[old_piece][sq]
+        self.phase += PHASE_WEIGHTS[piece] - PHASE_WEIGHTS[old_piece]
+        self.squares[sq] = piece
+        self.nested_state = None
+
+    # Returns the piece on the square (row * 8 + column; 0 => empty)
+    def piece_on(self, sq):
+        return self.squares[sq]
+
+    # Returns the bitboard of all pieces of the color (white if by_white) which attack the square
+    # occupied is the bitboard of the pieces which block sliders
+    def attackers_of(self, sq, occupied, by_white):
+        # Piece numbers of the attacking color are offset by 0 (white) or 10 (black)
+        offset = 0 if by_white else 10
+        bitboards = self.bitboards
+        # A pawn attacks the square, if a pawn of the other color on the square would attack the pawn
+        attackers = PAWN_ATTACKS[1 if by_white else 0][sq] & bitboards[1 + offset]
+        attackers |= KNIGHT_ATTACKS[sq] & bitboards[2 + offset]
+        attackers |= KING_ATTACKS[sq] & bitboards[6 + offset]
+        # Sliders (queens move like bishops and rooks)
+        queens = bitboards[5 + offset]
+        diagonal = bitboards[3 + offset] | queens
+        if diagonal:
+            attackers |= bishop_attacks(sq, occupied) & diagonal
+        straight = bitboards[4 + offset] | queens
+        if straight:
+            attackers |= rook_attacks(sq, occupied) & straight
+        return attackers
+
+    # Check if the square is attacked by the color (white if by_white)
+    def is_attacked(self, sq, by_white, occupied=None):
+        if occupied is None:
+            occupied = self.occupancy[0] | self.occupancy[1]
+        return self.attackers_of(sq, occupied, by_white) != 0
+
+    # Check if the square (row, col) is attacked by the other player (only_attack) or return (attacked, checks, pins)
+    # like Board.check_square; the attack test uses the bitboards (the king of the player to move does not block)
+    def check_square(self, r, c, only_attack=False):
+        if not only_attack:
+            return super().check_square(r, c)
+        us = 0 if self.white_move else 1
+        occupied = (self.occupancy[0] | self.occupancy[1]) & ~self.bitboards[6 + 10 * us]
+        return self.attackers_of(r * 8 + c, occupied, not self.white_move) != 0
+
+    # Check if the king of the player to move is attacked
+    def is_in_check(self):
+        offset = 0 if self.white_move else 10
+        king_sq = self.bitboards[6 + offset].bit_length() - 1
+        return self.attackers_of(king_sq, self.occupancy[0] | self.occupancy[1], not self.white_move) != 0
+
+    # Check if the player to move has other pieces than pawns and the king
+    def has_pieces(self):
+        offset = 0 if self.white_move else 10
+        bitboards = self.bitboards
+        return (bitboards[2 + offset] | bitboards[3 + offset] | bitboards[4 + offset] | bitboards[5 + offset]) != 0
+
+    # Get all legal moves in current position
+    # kind: ALL_MOVES, CAPTURE_MOVES or QUIET_MOVES (checkmate and stalemate are only set if all moves are generated)
+    def get_legal_moves(self, kind=ALL_MOVES):
+        return [Move(code) for code in self.get_legal_move_codes(kind)]
+
+    # Get the numbers of all legal moves in current position (see Move and get_legal_moves)
+    # The moves are generated as numbers, a Move is only created for the moves which are made
+    def get_legal_move_codes(self, kind=ALL_MOVES):
+        # Prepare the return list
+        moves = []
+        us = 0 if self.white_move else 1
+        offset = 10 * us
+        own = self.occupancy[us]
+        enemy = self.occupancy[1 - us]
+        occupied = own | enemy
+        # The squares the generated moves may end on (enemy pieces for captures, empty squares for quiet moves)
+        if kind == CAPTURE_MOVES:
+            allowed = enemy
+        elif kind == QUIET_MOVES:
+            allowed = ~occupied & FULL_BOARD
+        else:
+            allowed = FULL_BOARD
+        bitboards = self.bitboards
+        king_sq = (bitboards[6 + offset]).bit_length() - 1
+
+        # Get the pieces which give check
+        checkers = self.attackers_of(king_sq, occupied, not self.white_move)
+        self.check = checkers != 0
+        self.checks = []
+        self.pins = []
+
+        # King moves (the king is removed from the occupied squares, so it can not hide behind itself)
+        occupied_without_king = occupied ^ (1 << king_sq)
+        king_targets = 0
+        for to_sq in squares_of(KING_ATTACKS[king_sq] & ~own & allowed):
+            if not self.attackers_of(to_sq, occupied_without_king, not self.white_move):
+                king_targets |= 1 << to_sq
+        self.add_moves(moves, king_sq, king_targets)
+
+        # If there is more than one check only king moves are legal
+        if checkers & (checkers - 1) == 0:
+            # The squares other pieces may move to (everywhere or blocking/capturing a single checking piece)
+            if checkers:
+                checker_sq = checkers.bit_length() - 1
+                targets = BETWEEN[king_sq][checker_sq] | checkers
+            else:
+                targets = ~own
+            targets &= allowed
+
+            # Find the pinned pieces: an enemy slider on a line with the king with exactly one own piece between
+            pinned = 0
+            queens = bitboards[15 - offset]
+            snipers = (ROOK_SCOPE[king_sq] & (bitboards[14 - offset] | queens)) | (
+                    BISHOP_SCOPE[king_sq] & (bitboards[13 - offset] | queens))
+            for sniper_sq in squares_of(snipers):
+                blockers = BETWEEN[king_sq][sniper_sq] & occupied
+                if blockers and blockers & (blockers - 1) == 0 and blockers & own:
+                    pinned |= blockers
+
+            self.get_pawn_bitboard_moves(moves, king_sq, targets, pinned, occupied, enemy, kind != QUIET_MOVES)
+            # The loops over the pieces take the lowest bit without squares_of (they run for every generated position)
+            # Knights (a pinned knight can never move)
+            knights = bitboards[2 + offset] & ~pinned
+            while knights:
+                low_bit = knights & -knights
+                from_sq = low_bit.bit_length() - 1
+                self.add_moves(moves, from_sq, KNIGHT_ATTACKS[from_sq] & targets)
+                knights ^= low_bit
+            # Sliders (pinned sliders can only move on the line of the pin)
+            for piece, attacks in ((3, bishop_attacks), (4, rook_attacks), (5, queen_attacks)):
+                sliders = bitboards[piece + offset]
+                while sliders:
+                    low_bit = sliders & -sliders
+                    from_sq = low_bit.bit_length() - 1
+                    to_squares = attacks(from_sq, occupied) & targets
+                    if pinned & low_bit:
+                        to_squares &= LINE[king_sq][from_sq]
+                    self.add_moves(moves, from_sq, to_squares)
+                    sliders ^= low_bit
+            # Castling
+            if not checkers and kind != CAPTURE_MOVES:
+                self.get_castle_bitboard_moves(moves, king_sq, occupied)
+
+        # Check if there are no moves
+        if len(moves) == 0 and kind == ALL_MOVES:
+            if self.check:
+                self.checkmate = True
+            else:
+                self.stalemate = True
+
+        # Return all the legal moves
+        return moves
+
+    # Get all possible moves in current position (the bitboard generator only creates legal moves)
+    def get_moves(self):
+        return self.get_legal_moves()
+
+    # Adds the number of a move from the square to every square of the bitboard to_squares
+    def add_moves(self, moves, from_sq, to_squares):
+        squares = self.squares
+        # The part of the move number which is the same for all moves (see Move)
+        code = from_sq | squares[from_sq] << 12
+        while to_squares:
+            low_bit = to_squares & -to_squares
+            to_sq = low_bit.bit_length() - 1
+            moves.append(code | to_sq << 6 | squares[to_sq] << 17)
+            to_squares ^= low_bit
+
+    # Adds the numbers of the moves from (to - delta) to every square of the bitboard to_squares (used for pawns)
+    # Moves to the first or last row are added once for every promotion piece
+    def add_pawn_moves(self, moves, to_squares, delta):
+        squares = self.squares
+        pawn = 1 if self.white_move else 11
+        while to_squares:
+            low_bit = to_squares & -to_squares
+            to_sq = low_bit.bit_length() - 1
+            code = to_sq - delta | to_sq << 6 | pawn << 12 | squares[to_sq] << 17
+            if to_sq < 8 or to_sq >= 56:
+                # Promotion to queen, rook, bishop or knight
+                for piece in (4, 3, 2, 1):
+                    moves.append(code | (pawn + piece) << 22)
+            else:
+                moves.append(code)
+            to_squares ^= low_bit
+
+    # Adds the numbers of the legal pawn moves (pushes, captures and en passant if en_passant) to moves
+    def get_pawn_bitboard_moves(self, moves, king_sq, targets, pinned, occupied, enemy, en_passant=True):
+        white = self.white_move
+        pawns = self.bitboards[1 if white else 11]
+        empty = ~occupied & FULL_BOARD
+        # Direction of a pawn push on the board (white moves to lower rows)
+        push = -8 if white else 8
+
+        # Move all pawns which are not pinned at once by shifting the whole bitboard
+        free_pawns = pawns & ~pinned
+        if white:
+            one_step = (free_pawns >> 8) & empty
+            two_steps = ((one_step & ROW_3) >> 8) & empty
+            left_captures = ((free_pawns & ~COLUMN_A) >> 9) & enemy
+            right_captures = ((free_pawns & ~COLUMN_H) >> 7) & enemy
+            deltas = (-8, -16, -9, -7)
+        else:
+            one_step = (free_pawns << 8) & empty
+            two_steps = ((one_step & ROW_6) << 8) & empty
+            left_captures = ((free_pawns & ~COLUMN_A) << 7) & enemy
+            right_captures = ((free_pawns & ~COLUMN_H) << 9) & enemy
+            deltas = (8, 16, 7, 9)
+        self.add_pawn_moves(moves, one_step & targets, deltas[0])
+        self.add_pawn_moves(moves, two_steps & targets, deltas[1])
+        self.add_pawn_moves(moves, left_captures & targets, deltas[2])
+        self.add_pawn_moves(moves, right_captures & targets, deltas[3])
+
+        # Pinned pawns can only move on the line of the pin
+        start_row = 6 if white else 1
+        for from_sq in squares_of(pawns & pinned):
+            to_squares = 0
+            one_step = from_sq + push
+            if not occupied >> one_step & 1:
+                to_squares |= 1 << one_step
+                # Two squares from the start row
+                if from_sq // 8 == start_row and not occupied >> (one_step + push) & 1:
+                    to_squares |= 1 << (one_step + push)
+            to_squares |= PAWN_ATTACKS[0 if white else 1][from_sq] & enemy
+            to_squares &= targets & LINE[king_sq][from_sq]
+            for to_sq in squares_of(to_squares):
+                self.add_pawn_moves(moves, 1 << to_sq, to_sq - from_sq)
+
+        # En passant
+        pawns_piece = 1 if white else 11
+        if en_passant and self.en_passant_square != ():
+            ep_sq = self.en_passant_square[0] * 8 + self.en_passant_square[1]
+            # The captured pawn is behind the en passant square
+            captured_sq = ep_sq - push
+            # The pawns which can capture are on the squares a pawn of the other color on the ep square attacks
+            for from_sq in squares_of(PAWN_ATTACKS[1 if white else 0][ep_sq] & pawns):
+                # The move is legal if the king is not attacked after the pawns moved (removes pins and checks)
+                occupied_after = (occupied ^ (1 << from_sq) ^ (1 << captured_sq)) | (1 << ep_sq)
+                if not self.attackers_of(king_sq, occupied_after, not white) & ~(1 << captured_sq):
+                    moves.append(from_sq | ep_sq << 6 | pawns_piece << 12 | EN_PASSANT_FLAG)
+
+    # Adds the numbers of the castling moves to moves (only called if not in check)
+    def get_castle_bitboard_moves(self, moves, king_sq, occupied):
+        # Castling squares for each side: (right, rook piece, rook square, empty squares, king path, king target)
+        if self.white_move:
+            castles = ((self.w_queen_castle, 4, 56, (57, 58, 59), (58, 59), 58),
+                       (self.w_king_castle, 4, 63, (61, 62), (61, 62), 62))
+        else:
+            castles = ((self.b_queen_castle, 14, 0, (1, 2, 3), (2, 3), 2),
+                       (self.b_king_castle, 14, 7, (5, 6), (5, 6), 6))
+        for right, rook, rook_sq, empty_squares, path, target in castles:
+            if right and self.bitboards[rook] >> rook_sq & 1 and all(
+                    not occupied >> sq & 1 for sq in empty_squares) and not any(
+                    self.is_attacked(sq, not self.white_move, occupied) for sq in path):
+                moves.append(king_sq | target << 6 | (rook + 2) << 12 | CASTLE_FLAG)
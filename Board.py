@@ -1,3 +1,46 @@
+import copy
+import csv
+import random
+from AttackTables import DIRECTIONS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS, QUEEN_DIRECTIONS, RAY_SQUARES, \
+    KNIGHT_SQUARES, KING_SQUARES, NEAR_ATTACKERS, FAR_ATTACKERS, BETWEEN
+from Evaluation import MG_SCORES, EG_SCORES, PHASE_WEIGHTS
+
+# The (row, column) position of every square number (row * 8 + column)
+SQUARE_POS = [(sq // 8, sq % 8) for sq in range(64)]
+
+# A move is stored as one number:
+# bits 0-5: old square; bits 6-11: new square; bits 12-16: piece; bits 17-21: captured piece;
+# bits 22-26: promotion piece (0 if no promotion); bit 27: en passant capture; bit 28: castling
+EN_PASSANT_FLAG = 1 << 27
+CASTLE_FLAG = 1 << 28
+# The bits which identify a move (old square, new square, piece and promotion piece) => used to compare moves
+MOVE_IDENTITY_MASK = 0x7C1FFFF
+
+# Kinds of moves get_legal_moves can generate
+ALL_MOVES = 0
+# Captures and en passant captures
+CAPTURE_MOVES = 1
+# All moves which don't capture (including castling and promotions without capture)
+QUIET_MOVES = 2
+
+# Random numbers of the zobrist hash (fixed seed => the keys are the same in every run, so they can be stored)
+zobrist_random = random.Random(2020)
+# One number for every piece on every square: ZOBRIST_PIECES[piece][row * 8 + col] (piece 0 => empty => 0)
+ZOBRIST_PIECES = [[zobrist_random.getrandbits(64) if 0 < piece % 10 <= 6 else 0 for sq in range(64)]
+                  for piece in range(17)]
+# Toggled if it is blacks turn
+ZOBRIST_BLACK_MOVE = zobrist_random.getrandbits(64)
+# One number for each castling right (white king side, white queen side, black king side, black queen side)
+ZOBRIST_CASTLING = [zobrist_random.getrandbits(64) for i in range(4)]
+# One number for each column of an en passant square
+ZOBRIST_EN_PASSANT = [zobrist_random.getrandbits(64) for i in range(8)]
+
+# The piece number of every letter of the FEN notation (upper case: white, lower case: black)
+FEN_PIECES = {"P": 1, "N": 2, "B": 3, "R": 4, "Q": 5, "K": 6, "p": 11, "n": 12, "b": 13, "r": 14, "q": 15, "k": 16}
+# The FEN letter of every piece number
+FEN_LETTERS = {piece: letter for letter, piece in FEN_PIECES.items()}
+
+
 # The class of the board and the state of the game
 class Board:
     # Initialize the board
@@ -22,6 +65,10 @@ class Board:
 
         # List of all the moves which were played
         self.move_history = []
+        # Saved state before every move of move_history (see make_move and unmake_move)
+        self.undo_stack = []
+        # Saved state before every null move (see make_null_move)
+        self.null_move_stack = []
 
         # Indicating whether white has to move or not
         self.white_move = True
@@ -35,6 +82,10 @@ class Board:
         self.checks = []
         # List of the pins (row, column, direction)
         self.pins = []
+        # The pinned pieces: {row * 8 + column: direction}
+        self.pinned = {}
+        # The kind of moves which is currently generated (see get_legal_moves)
+        self.move_kind = ALL_MOVES
 
         # Keeps track of an en passant square, if there is one (row, column)
         self.en_passant_square = ()
@@ -45,51 +96,230 @@ class Board:
         self.b_queen_castle = True
         self.w_queen_castle = True
 
+        # Number of plies since the last capture or pawn move (50 move rule)
+        self.halfmove_clock = 0
+        # Number of plies which were played before the first move of move_history (set by load_fen)
+        self.start_ply = 0
+        # Set to true if the player castled
+        self.w_castled = False
+        self.b_castled = False
+
+        # 64 bit zobrist hash of the position (pieces, player, castling rights, en passant square)
+        self.zobrist_key = self.calculate_zobrist_key()
+        # The evaluation terms (see Evaluation; they are updated by put_piece)
+        self.mg_score, self.eg_score, self.phase = self.calculate_evaluation_terms()
+
     # Makes a move;
-    # undo has to be true if the move should be deleted => do the move backwards
+    # undo has to be true if the move should be deleted => the last move is taken back (see unmake_move)
     def make_move(self, move, undo=False):
-        # Delete move if undo
+        # Take back the last move if undo
         if undo:
-            self.move_history.remove(move)
-        # Append move if not undo
+            self.unmake_move()
+            return
+
+        # Save everything the move changes and which can not be calculated back from the move itself
+        self.save_undo_state()
+
+        # Append move
+        self.move_history.append(move)
+
+        # Read the information out of the move number
+        code = move.code
+        old_sq = code & 63
+        new_sq = code >> 6 & 63
+        piece = code >> 12 & 31
+
+        # Captures and pawn moves reset the halfmove clock
+        if code >> 17 & 31 or piece == 1 or piece == 11:
+            self.halfmove_clock = 0
         else:
-            self.move_history.append(move)
+            self.halfmove_clock += 1
 
-        # Undo checkmate and stalemate
-        if undo:
-            self.checkmate = False
-            self.stalemate = False
+        # Remove the old castling rights and en passant square from the hash (added again after the move)
+        self.zobrist_key ^= self.zobrist_rights_key()
 
         # Updates the castling rights
-        self.update_castling_rights(move, undo)
+        self.update_castling_rights(move)
 
         # Update the kings positions, if king was moved
-        if move.piece == 6:  # piece is white king
-            self.w_king_pos = move.new_pos if not undo else move.old_pos  # if undo the old position of the move is
-            # the current king position
-        elif move.piece == 16:  # piece is black king
-            self.b_king_pos = move.new_pos if not undo else move.old_pos  # if undo the old position of the move is
-            # the current king position
+        if piece == 6:  # piece is white king
+            self.w_king_pos = SQUARE_POS[new_sq]
+        elif piece == 16:  # piece is black king
+            self.b_king_pos = SQUARE_POS[new_sq]
 
         # Move the piece
-        # Set the old square (new square if undo) to 0 => empty
-        if not undo:
-            self.state[move.old_pos[0]][move.old_pos[1]] = 0
-        else:
-            self.state[move.new_pos[0]][move.new_pos[1]] = move.captured_piece
-        # Set the new square (old square if undo) to the piece which was moved
-        self.state[move.new_pos[0] if not undo else move.old_pos[0]][
-            move.new_pos[1] if not undo else move.old_pos[1]] = move.piece
+        # Set the old square to 0 => empty
+        self.put_piece(old_sq >> 3, old_sq & 7, 0)
+        # Set the new square to the piece which was moved
+        self.put_piece(new_sq >> 3, new_sq & 7, piece)
 
         # Makes special moves (en passant, castling, promotion)
-        self.make_special_move(move, undo)
+        self.make_special_move(move)
 
         # Switch the player
         self.white_move = not self.white_move
 
+        # Add the new castling rights and en passant square and the new player to the hash
+        self.zobrist_key ^= self.zobrist_rights_key() ^ ZOBRIST_BLACK_MOVE
+
         # Check for a draw
         self.check_draw()
 
+    # Takes back the last move (restores the state before the move from the undo stack)
+    def unmake_move(self):
+        move = self.move_history.pop()
+        saved = self.undo_stack[len(self.move_history)]
+        code = move.code
+        old_sq = code & 63
+        new_sq = code >> 6 & 63
+
+        # Switch the player back
+        self.white_move = not self.white_move
+
+        # Put the captured piece (0 if there was none) back and the moved piece on its old square
+        # (for a promotion this replaces the new piece with the pawn)
+        self.put_piece(new_sq >> 3, new_sq & 7, code >> 17 & 31)
+        self.put_piece(old_sq >> 3, old_sq & 7, code >> 12 & 31)
+
+        # Take back the special moves
+        if code & EN_PASSANT_FLAG:
+            # Create the captured pawn at the row of the old position and the column of the new position
+            # (1: white pawn; 11: black pawn)
+            self.put_piece(old_sq >> 3, new_sq & 7, 11 if self.white_move else 1)
+        elif code & CASTLE_FLAG:
+            # The player has not castled anymore
+            if new_sq > 8:
+                self.w_castled = False
+            else:
+                self.b_castled = False
+            # White queen side
+            if new_sq == 58:
+                self.put_piece(7, 3, 0)
+                self.put_piece(7, 0, 4)  # Set the rook
+            # White king side
+            elif new_sq == 62:
+                self.put_piece(7, 5, 0)
+                self.put_piece(7, 7, 4)  # Set the rook
+            # Black queen side
+            elif new_sq == 2:
+                self.put_piece(0, 3, 0)
+                self.put_piece(0, 0, 14)  # Set the rook
+            # Black king side
+            elif new_sq == 6:
+                self.put_piece(0, 5, 0)
+                self.put_piece(0, 7, 14)  # Set the rook
+
+        # Restore everything else
+        self.restore_undo_state(saved)
+
+    # Saves everything a move changes and which can not be calculated back from the move itself on the undo stack
+    # (the entries of the undo stack are reused, so no new list has to be created for every move)
+    def save_undo_state(self):
+        ply = len(self.move_history)
+        if ply == len(self.undo_stack):
+            self.undo_stack.append([None] * 12)
+        saved = self.undo_stack[ply]
+        saved[0] = self.w_king_castle
+        saved[1] = self.w_queen_castle
+        saved[2] = self.b_king_castle
+        saved[3] = self.b_queen_castle
+        saved[4] = self.en_passant_square
+        saved[5] = self.w_king_pos
+        saved[6] = self.b_king_pos
+        saved[7] = self.check
+        saved[8] = self.checkmate
+        saved[9] = self.stalemate
+        saved[10] = self.zobrist_key
+        saved[11] = self.halfmove_clock
+
+    # Restores the state of an entry of the undo stack (see save_undo_state)
+    def restore_undo_state(self, saved):
+        self.w_king_castle = saved[0]
+        self.w_queen_castle = saved[1]
+        self.b_king_castle = saved[2]
+        self.b_queen_castle = saved[3]
+        self.en_passant_square = saved[4]
+        self.w_king_pos = saved[5]
+        self.b_king_pos = saved[6]
+        self.check = saved[7]
+        self.checkmate = saved[8]
+        self.stalemate = saved[9]
+        self.zobrist_key = saved[10]
+        self.halfmove_clock = saved[11]
+
+    # Passes the turn to the other player without moving a piece (used by the null move pruning of the search)
+    # Must not be called in check; it is not added to the move history and is taken back by unmake_null_move
+    # (the length of the move history is saved, so it is known which moves were made after the null move, see
+    # Ai.take_back_search_moves)
+    def make_null_move(self):
+        self.null_move_stack.append((self.en_passant_square, self.zobrist_key, self.check, self.halfmove_clock,
+                                     len(self.move_history)))
+        # The en passant square is gone after any move
+        self.zobrist_key ^= self.zobrist_rights_key()
+        self.en_passant_square = ()
+        self.white_move = not self.white_move
+        self.zobrist_key ^= self.zobrist_rights_key() ^ ZOBRIST_BLACK_MOVE
+        self.halfmove_clock += 1
+        # The other player can not be in check (else the position before would have been illegal)
+        self.check = False
+
+    # Takes back the last null move (the moves which were made after it have to be taken back first)
+    def unmake_null_move(self):
+        if self.null_move_stack[-1][4] != len(self.move_history):
+            raise ValueError("the moves after the null move were not taken back")
+        self.white_move = not self.white_move
+        self.en_passant_square, self.zobrist_key, self.check, self.halfmove_clock, length = self.null_move_stack.pop()
+
+    # Puts a piece (0 => empty) on the square (row, col);
+    # Every change of the state during a move goes through here, so subclasses can keep extra data in sync
+    def put_piece(self, row, col, piece):
+        sq = row * 8 + col
+        old_piece = self.state[row][col]
+        # Update the hash (remove the old piece, add the new one)
+        self.zobrist_key ^= ZOBRIST_PIECES[old_piece][sq] ^ ZOBRIST_PIECES[piece][sq]
+        # Update the evaluation terms the same way
+        self.mg_score += MG_SCORES[piece][sq] - MG_SCORES[old_piece][sq]
+        self.eg_score += EG_SCORES[piece][sq] - EG_SCORES[old_piece][sq]
+        self.phase += PHASE_WEIGHTS[piece] - PHASE_WEIGHTS[old_piece]
+        self.state[row][col] = piece
+
+    # Calculates the evaluation terms (middle game score, end game score, phase) from scratch (see Evaluation)
+    def calculate_evaluation_terms(self):
+        mg_score = eg_score = phase = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.state[row][col]
+                mg_score += MG_SCORES[piece][row * 8 + col]
+                eg_score += EG_SCORES[piece][row * 8 + col]
+                phase += PHASE_WEIGHTS[piece]
+        return mg_score, eg_score, phase
+
+    # Returns the part of the zobrist hash of the castling rights and the en passant square
+    def zobrist_rights_key(self):
+        key = 0
+        if self.w_king_castle:
+            key ^= ZOBRIST_CASTLING[0]
+        if self.w_queen_castle:
+            key ^= ZOBRIST_CASTLING[1]
+        if self.b_king_castle:
+            key ^= ZOBRIST_CASTLING[2]
+        if self.b_queen_castle:
+            key ^= ZOBRIST_CASTLING[3]
+        if self.en_passant_square != ():
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant_square[1]]
+        return key
+
+    # Calculates the zobrist hash of the position from scratch
+    def calculate_zobrist_key(self):
+        key = self.zobrist_rights_key()
+        # Iterate through the state and add every piece
+        for row in range(8):
+            for col in range(8):
+                key ^= ZOBRIST_PIECES[self.state[row][col]][row * 8 + col]
+        if not self.white_move:
+            key ^= ZOBRIST_BLACK_MOVE
+        return key
+
     # Reset the board
     def reset_board(self):
         # Reset the state
@@ -107,8 +337,10 @@ class Board:
         self.w_king_pos = (7, 4)
         self.b_king_pos = (0, 4)
 
-        # Reset the move_history
+        # Reset the move_history and the undo stack
         self.move_history = []
+        self.undo_stack = []
+        self.null_move_stack = []
 
         # Indicating whether white has to move or not
         self.white_move = True
@@ -122,6 +354,10 @@ class Board:
         self.checks = []
         # List of the pins (row, column, direction)
         self.pins = []
+        # The pinned pieces: {row * 8 + column: direction}
+        self.pinned = {}
+        # The kind of moves which is currently generated (see get_legal_moves)
+        self.move_kind = ALL_MOVES
 
         # Keeps track of an en passant square, if there is one (row, column)
         self.en_passant_square = ()
@@ -132,127 +368,180 @@ class Board:
         self.b_queen_castle = True
         self.w_queen_castle = True
 
-    # Takes a move and checks if this move breaks castling rights and updates them;
-    # If undo it checks if the move broke castling rights
-    def update_castling_rights(self, move, undo):
-        if undo:
-            if move.broke_queen_side_castle:
-                if move.piece < 10:  # Check if move broke white queen side castle
-                    self.w_queen_castle = True
-                else:  # Move broke black queen side castle
-                    self.b_queen_castle = True
-            if move.broke_king_side_castle:
-                if move.piece < 10:  # Check if move broke white king side castle
-                    self.w_king_castle = True
-                else:  # Move broke black king side castle
-                    self.b_king_castle = True
-        else:
-            # Check if moved piece is a white rook
-            if move.piece == 4:
-                # Broke white queen side castle
-                if move.old_pos == (7, 0) and self.w_queen_castle:
-                    self.w_queen_castle = False
-                    move.broke_queen_side_castle = True
-                # Broke white king side castle
-                elif move.old_pos == (7, 7) and self.w_king_castle:
-                    self.w_king_castle = False
-                    move.broke_king_side_castle = True
-            # Check if piece is a black rook
-            elif move.piece == 14:
-                # Broke black queen side castle
-                if move.old_pos == (0, 0) and self.b_queen_castle:
-                    self.b_queen_castle = False
-                    move.broke_queen_side_castle = True
-                # Broke black king side castle
-                elif move.old_pos == (0, 7) and self.b_king_castle:
-                    self.b_king_castle = False
-                    move.broke_king_side_castle = True
-            # Check if piece is white king and there are castling rights left
-            elif move.piece == 6 and (self.w_king_castle or self.w_queen_castle):
-                # Determine the castling right, which the move broke
-                # (king move breaks both, but if one right was already broken,
-                # the king move broke only one)
-                if self.w_king_castle:
-                    move.broke_king_side_castle = True
-                if self.w_queen_castle:
-                    move.broke_queen_side_castle = True
-                self.w_king_castle = False
+        # Number of plies since the last capture or pawn move (50 move rule)
+        self.halfmove_clock = 0
+        # Number of plies which were played before the first move of move_history (set by load_fen)
+        self.start_ply = 0
+        # Set to true if the player castled
+        self.w_castled = False
+        self.b_castled = False
+
+        # Reset the hash
+        self.zobrist_key = self.calculate_zobrist_key()
+        # Reset the evaluation terms
+        self.mg_score, self.eg_score, self.phase = self.calculate_evaluation_terms()
+
+    # Sets up the position of a FEN string (e.g. "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    def load_fen(self, fen):
+        self.reset_board()
+        fields = fen.split()
+        # Piece placement (the first row of the FEN is row 0 of the state)
+        self.state = [[0] * 8 for i in range(8)]
+        for row, pieces in enumerate(fields[0].split("/")):
+            col = 0
+            for letter in pieces:
+                if letter.isdigit():
+                    # Number of empty squares
+                    col += int(letter)
+                else:
+                    self.state[row][col] = FEN_PIECES[letter]
+                    if letter == "K":
+                        self.w_king_pos = (row, col)
+                    elif letter == "k":
+                        self.b_king_pos = (row, col)
+                    col += 1
+        # Player to move
+        self.white_move = len(fields) < 2 or fields[1] == "w"
+        # Castling rights
+        castling = fields[2] if len(fields) > 2 else "-"
+        self.w_king_castle = "K" in castling
+        self.w_queen_castle = "Q" in castling
+        self.b_king_castle = "k" in castling
+        self.b_queen_castle = "q" in castling
+        # En passant square (e.g. "e3" => (5, 4))
+        if len(fields) > 3 and fields[3] != "-":
+            self.en_passant_square = (8 - int(fields[3][1]), ord(fields[3][0]) - ord("a"))
+        # Halfmove clock
+        if len(fields) > 4:
+            self.halfmove_clock = int(fields[4])
+        # Fullmove number (starts at 1 and is increased after every black move)
+        if len(fields) > 5:
+            self.start_ply = 2 * (int(fields[5]) - 1)
+        if not self.white_move:
+            self.start_ply += 1
+        self.zobrist_key = self.calculate_zobrist_key()
+        self.mg_score, self.eg_score, self.phase = self.calculate_evaluation_terms()
+
+    # Creates a board (or a board of a subclass e.g. BitBoard) with the position of a FEN string
+    @classmethod
+    def from_fen(cls, fen):
+        board = cls()
+        board.load_fen(fen)
+        return board
+
+    # Returns an independent copy of the board with the same position and move history (e.g. for a search in another
+    # thread while this board is shown and played on)
+    def copy(self):
+        return copy.deepcopy(self)
+
+    # Returns the FEN string of the position
+    def to_fen(self):
+        rows = []
+        for row in self.state:
+            fen_row = ""
+            empty = 0
+            for piece in row:
+                if piece == 0:
+                    empty += 1
+                else:
+                    # Write the number of empty squares before the piece
+                    if empty != 0:
+                        fen_row += str(empty)
+                        empty = 0
+                    fen_row += FEN_LETTERS[piece]
+            if empty != 0:
+                fen_row += str(empty)
+            rows.append(fen_row)
+        castling = ("K" if self.w_king_castle else "") + ("Q" if self.w_queen_castle else "") + (
+            "k" if self.b_king_castle else "") + ("q" if self.b_queen_castle else "")
+        en_passant = "-"
+        if self.en_passant_square != ():
+            en_passant = "abcdefgh"[self.en_passant_square[1]] + str(8 - self.en_passant_square[0])
+        fullmove_number = (self.start_ply + len(self.move_history)) // 2 + 1
+        return " ".join(("/".join(rows), "w" if self.white_move else "b", castling or "-", en_passant,
+                         str(self.halfmove_clock), str(fullmove_number)))
+
+    # Takes a move and checks if this move breaks castling rights and updates them
+    def update_castling_rights(self, move):
+        piece = move.code >> 12 & 31
+        old_sq = move.code & 63
+        new_sq = move.code >> 6 & 63
+        # Capturing a rook on its start square breaks the castling of the other player
+        if new_sq == 56:
+            self.w_queen_castle = False
+        elif new_sq == 63:
+            self.w_king_castle = False
+        elif new_sq == 0:
+            self.b_queen_castle = False
+        elif new_sq == 7:
+            self.b_king_castle = False
+        # Check if moved piece is a white rook
+        if piece == 4:
+            # Broke white queen side castle
+            if old_sq == 56:
                 self.w_queen_castle = False
-            # Check if piece is black king and there are castling rights left
-            elif move.piece == 16 and (self.b_king_castle or self.b_queen_castle):
-                # Determine the castling right, which the move broke
-                # (king move breaks both, but if one right was already broken,
-                # the king move broke only one)
-                if self.b_king_castle:
-                    move.broke_king_side_castle = True
-                if self.b_queen_castle:
-                    move.broke_queen_side_castle = True
-                self.b_king_castle = False
+            # Broke white king side castle
+            elif old_sq == 63:
+                self.w_king_castle = False
+        # Check if piece is a black rook
+        elif piece == 14:
+            # Broke black queen side castle
+            if old_sq == 0:
                 self.b_queen_castle = False
+            # Broke black king side castle
+            elif old_sq == 7:
+                self.b_king_castle = False
+        # Check if piece is white king (a king move breaks both)
+        elif piece == 6:
+            self.w_king_castle = False
+            self.w_queen_castle = False
+        # Check if piece is black king (a king move breaks both)
+        elif piece == 16:
+            self.b_king_castle = False
+            self.b_queen_castle = False
 
-    # Make any special move
-    # If undo it makes the move backwards
-    def make_special_move(self, move, undo):
-        # Check if move is a pawn promotion (the undo logic is already completed in the main make move function)
-        if move.promotion and not undo:
-            # Make a queen (5: white queen; 15: black queen)
-            self.state[move.new_pos[0]][move.new_pos[1]] = 5 if self.white_move else 15
+    # Make any special move (en passant, castling, promotion) and update the en passant square
+    def make_special_move(self, move):
+        code = move.code
+        old_sq = code & 63
+        new_sq = code >> 6 & 63
+        # Check if move is a pawn promotion
+        if code >> 22 & 31:
+            # Put the promotion piece on the new square
+            self.put_piece(new_sq >> 3, new_sq & 7, code >> 22 & 31)
         # Check if move is an en passant capture
-        elif move.en_passant_capture:
-            if not undo:
-                # Capture the piece on the row of the old position and the column of the new postion
-                self.state[move.old_pos[0]][move.new_pos[1]] = 0
-                # Reset en passant square
-                self.en_passant_square = ()
-            else:
-                # Undo the capture => create pawn at the captured square (1: white pawn; 11: black pawn)
-                self.state[move.old_pos[0]][move.new_pos[1]] = 1 if self.white_move else 11
-                # Set the en passant square
-                self.en_passant_square = (move.old_pos[0], move.new_pos[1])
-        # Check if move creates en passant square => pawn moves two squares up
-        elif (move.piece == 1 or move.piece == 11) and abs(move.new_pos[0] - move.old_pos[0]) == 2:
-            if not undo:
-                # Update the en passant square
-                self.en_passant_square = (2 if not self.white_move else 5, move.new_pos[1])
-            else:
-                # Reset the en_passant square
-                self.en_passant_square = ()
+        elif code & EN_PASSANT_FLAG:
+            # Capture the piece on the row of the old position and the column of the new postion
+            self.put_piece(old_sq >> 3, new_sq & 7, 0)
         # Check if move is castling move
-        elif move.is_castle:
-            if not undo:
-                # White queen side
-                if move.new_pos == (7, 2):
-                    self.state[7][3] = 4  # Set the rook
-                    self.state[7][0] = 0
-                # White king side
-                elif move.new_pos == (7, 6):
-                    self.state[7][5] = 4  # Set the rook
-                    self.state[7][7] = 0
-                # Black queen side
-                elif move.new_pos == (0, 2):
-                    self.state[0][3] = 14  # Set the rook
-                    self.state[0][0] = 0
-                # Black king side
-                elif move.new_pos == (0, 6):
-                    self.state[0][5] = 14  # Set the rook
-                    self.state[0][7] = 0
+        elif code & CASTLE_FLAG:
+            # Remember the castling for the evaluation
+            if new_sq > 8:
+                self.w_castled = True
             else:
-                # White queen side
-                if move.new_pos == (7, 2):
-                    self.state[7][3] = 0
-                    self.state[7][0] = 4  # Set the rook
-                # White king side
-                elif move.new_pos == (7, 6):
-                    self.state[7][5] = 0
-                    self.state[7][7] = 4  # Set the rook
-                # Black queen side
-                elif move.new_pos == (0, 2):
-                    self.state[0][3] = 0
-                    self.state[0][0] = 14  # Set the rook
-                # Black king side
-                elif move.new_pos == (0, 6):
-                    self.state[0][5] = 0
-                    self.state[0][7] = 14  # Set the rook
+                self.b_castled = True
+            # White queen side
+            if new_sq == 58:
+                self.put_piece(7, 3, 4)  # Set the rook
+                self.put_piece(7, 0, 0)
+            # White king side
+            elif new_sq == 62:
+                self.put_piece(7, 5, 4)  # Set the rook
+                self.put_piece(7, 7, 0)
+            # Black queen side
+            elif new_sq == 2:
+                self.put_piece(0, 3, 14)  # Set the rook
+                self.put_piece(0, 0, 0)
+            # Black king side
+            elif new_sq == 6:
+                self.put_piece(0, 5, 14)  # Set the rook
+                self.put_piece(0, 7, 0)
+
+        # Check if move creates en passant square => pawn moves two squares up
+        piece = code >> 12 & 31
+        if (piece == 1 or piece == 11) and (new_sq - old_sq == 16 or old_sq - new_sq == 16):
+            # Update the en passant square (the square the pawn jumped over)
+            self.en_passant_square = SQUARE_POS[(old_sq + new_sq) // 2]
         else:
             # No en passant
             self.en_passant_square = ()
@@ -264,96 +553,101 @@ class Board:
         attacked = False
         attackers = []
         pins = []
+        state = self.state
+        white_move = self.white_move
 
-        # Directions: (row, col) 0-3 = Rook Directions; 4-7 = Bishop Directions
-        directions = [(-1, 0), (0, 1), (0, -1), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-
+        # The squares in every direction (0-3 = Rook Directions; 4-7 = Bishop Directions) come from the tables
+        rays = RAY_SQUARES[r * 8 + c]
         # Iterate through all the directions
-        for j in range(len(directions)):
-            d = directions[j]  # The current direction
+        for j in range(8):
             possible_pin = ()  # Keeps track of possible pins in this direction
+            # Pieces which can attack from the next square
+            can_attack = NEAR_ATTACKERS[j]
             # Iterate in the direction
-            for i in range(1, 8):
-                current_r = r + (i * d[0])  # Set row of current square (the start row + the steps in a direction)
-                current_c = c + (i * d[1])  # Set column of current square (the start col + the steps in a direction)
-                # Check if the square is still on the board
-                if 0 <= current_r < 8 and 0 <= current_c < 8:
-                    piece = self.state[current_r][current_c]  # Get the piece on the current square
+            for current_r, current_c in rays[j]:
+                piece = state[current_r][current_c]  # Get the piece on the current square
+                if piece != 0:
                     # Check if the piece is your own piece and not a king => because you cannot hide behind the king
-                    if ((piece > 10 and not self.white_move) or (0 < piece < 10 and self.white_move)) and (
-                            piece != 16 and piece != 6):
-                        # Check if there is already a possible pin in that direction (if so there is no danger for
-                        # attacks and pins, because two of our pieces are stacked up in that direction) => break
-                        if possible_pin != ():
-                            break
-                        else:
-                            possible_pin = (
-                                current_r, current_c, d[0], d[1])  # There is a new possible pin in that direction
-                    # Check if there is an enemy piece
-                    elif (piece > 10 and self.white_move) or (0 < piece < 10 and not self.white_move):
-                        # Check if the enemy piece can attack Check if there is a rook and the direction is a rook
-                        # direction Check if there is a bishop and the direction is a bishop direction Check if there
-                        # is a pawn and the direction is a direction from which the pawn can attack (different for
-                        # black and white) Check if there is a queen Check if there is a king and the distance is 1
-                        if (0 <= j <= 3 and (piece == 14 or piece == 4)) or (
-                                4 <= j <= 7 and (piece == 13 or piece == 3)) or (
-                                i == 1 and ((piece == 1 and 6 <= j <= 7) or (piece == 11 and 4 <= j <= 5))) or (
-                                piece == 15 or piece == 5) or (i == 1 and (piece == 6 or piece == 16)):
-                            # Check if there is a possible pin in the direction d
+                    if (piece < 10) == white_move:
+                        if piece != 16 and piece != 6:
+                            # Check if there is already a possible pin in that direction (if so there is no danger
+                            # for attacks and pins, because two of our pieces are stacked up in that direction)
                             if possible_pin != ():
-                                pins.append(possible_pin)  # The possible pin is now a real pin, because of the attacker
-
-                            else:
-                                # There is a direct attacker
-                                attacked = True
-                                attackers.append((current_r, current_c, d[0], d[1]))
                                 break
+                            # There is a new possible pin in that direction
+                            possible_pin = (current_r, current_c, DIRECTIONS[j][0], DIRECTIONS[j][1])
+                    # There is an enemy piece: Check if the enemy piece can attack from this distance
+                    elif piece in can_attack:
+                        # Check if there is a possible pin in the direction
+                        if possible_pin != ():
+                            pins.append(possible_pin)  # The possible pin is now a real pin, because of the attacker
                         else:
-                            # There is an enemy piece which can not attack, so we do not have to check further in
-                            # that direction
-                            break
-                else:
-                    # Out of borders
-                    break
-
-        # Knight moves
-        knight_moves = [(-1, -2), (-2, -1), (-2, 1), (-1, 2), (1, -2), (2, -1), (2, 1), (1, 2)]
-        # Iterate through all the knight moves from start position
-        for m in knight_moves:
-            current_r = r + m[0]  # Set row of current square (the start row + the knight move)
-            current_c = c + m[1]  # Set column of current square (the start column + the knight move)
-            # Check if current square is still on the board
-            if 0 <= current_r < 8 and 0 <= current_c < 8:
-                piece = self.state[current_r][current_c]  # Get the piece from the current square
-                # Check if the piece is a enemy knight, so it can attack the square
-                if (piece == 12 and self.white_move) or (piece == 2 and not self.white_move):
-                    # There is an attacking knight
-                    attacked = True
-                    attackers.append((current_r, current_c, m[0], m[1]))
+                            # There is a direct attacker
+                            if only_attack:
+                                return True
+                            attacked = True
+                            attackers.append((current_r, current_c, DIRECTIONS[j][0], DIRECTIONS[j][1]))
+                        break
+                    else:
+                        # There is an enemy piece which can not attack, so we do not have to check further in
+                        # that direction
+                        break
+                # Only sliders can attack from further away
+                can_attack = FAR_ATTACKERS[j]
+
+        # Iterate through all the squares from which a knight attacks
+        enemy_knight = 12 if white_move else 2
+        for current_r, current_c, step_r, step_c in KNIGHT_SQUARES[r * 8 + c]:
+            # Check if the piece is a enemy knight, so it can attack the square
+            if state[current_r][current_c] == enemy_knight:
+                # There is an attacking knight
+                if only_attack:
+                    return True
+                attacked = True
+                attackers.append((current_r, current_c, step_r, step_c))
 
         if only_attack:
             return attacked
         return attacked, attackers, pins
 
-    # Check for a draw (no capture or pawn move in the last 50 moves)
+    # Returns the piece on the square (row * 8 + column; 0 => empty)
+    def piece_on(self, sq):
+        return self.state[sq >> 3][sq & 7]
+
+    # Check if the king of the player to move is attacked
+    def is_in_check(self):
+        king_r, king_c = self.w_king_pos if self.white_move else self.b_king_pos
+        return self.check_square(king_r, king_c, only_attack=True)
+
+    # Check if the player to move has other pieces than pawns and the king
+    def has_pieces(self):
+        offset = 0 if self.white_move else 10
+        for row in self.state:
+            for piece in row:
+                if offset + 1 < piece < offset + 6:
+                    return True
+        return False
+
+    # Check for a draw (no capture or pawn move in the last 50 moves => 100 plies)
     def check_draw(self):
-        if len(self.move_history) >= 50:
-            is_draw = True
-            for move in self.move_history[-50:]:
-                if move.captured_piece != 0 or move.piece == 1 or move.piece == 11:
-                    is_draw = False
-            if is_draw:
-                self.stalemate = True
+        if self.halfmove_clock >= 100:
+            self.stalemate = True
+
     # Get all legal moves in current position
-    def get_legal_moves(self):
+    # kind: ALL_MOVES, CAPTURE_MOVES or QUIET_MOVES (checkmate and stalemate are only set if all moves are generated)
+    def get_legal_moves(self, kind=ALL_MOVES):
         # Prepare the return list
         moves = []
+        # The kind of moves add_move and add_pawn_move keep
+        self.move_kind = kind
         # Get the current king row out of the king position of the correct color
         king_r = self.w_king_pos[0] if self.white_move else self.b_king_pos[0]
         # Get the current king col out of the king position of the correct color
         king_c = self.w_king_pos[1] if self.white_move else self.b_king_pos[1]
         # Update the check, pins, checks of board (check the square of the king)
         self.check, self.checks, self.pins = self.check_square(king_r, king_c)
+        # The pinned pieces: {square: direction of the pin}
+        self.pinned = {pin[0] * 8 + pin[1]: (pin[2], pin[3]) for pin in self.pins}
         # Check if board is in check
         if self.check:
             # Check if there is only one check
@@ -362,41 +656,22 @@ class Board:
                 moves = self.get_moves()
 
                 # Get the information about the check
-                check_info = self.checks[0]
-                check_r = check_info[0]  # Set the row of the checking piece
-                check_c = check_info[1]  # Set the column of the checking piece
+                check_r, check_c = self.checks[0][0], self.checks[0][1]
                 checking_piece = self.state[check_r][check_c]  # Get the checking piece
 
-                # List of the valid squares to avoid the check
-                valid_squares = []
+                # Bitboard of the valid squares to avoid the check (capture the checking piece)
+                valid_squares = 1 << (check_r * 8 + check_c)
+                # Knights can not be blocked, the squares between the king and any other piece block the check
+                if checking_piece != 2 and checking_piece != 12:
+                    valid_squares |= BETWEEN[king_r * 8 + king_c][check_r * 8 + check_c]
 
-                # Check if the checking piece is a knight
-                if checking_piece == 2 or checking_piece == 12:
-                    # Knights can not be blocked, so the only valid square is the capture of the knight
-                    valid_squares = [(check_r, check_c)]
-                else:
-                    # Iterate through the squares in the direction of the check
-                    for i in range(1, 8):
-                        # Blocking the check is a valid square
-                        # (Going i steps in the check direction, which is in the checking_info 2/3)
-                        valid_square = (king_r + check_info[2] * i, king_c + check_info[3] * i)
-                        valid_squares.append(valid_square)
-                        # Check if we iterated to the square where the attacker is and break
-                        if valid_square[0] == check_r and valid_square[1] == check_c:
-                            break
-
-                # Remove every move which is not ending at one of the valid squares
-                # Iteration backwards through all the possible moves, because we want to remove moves
-                # If the iteration would be forward, the indexes would shift
-                for i in range(len(moves) - 1, -1, -1):
-                    # Check if piece of the move is a king => we cant block a check with our king
-                    if moves[i].piece != 6 and moves[i].piece != 16:
-                        # Check if the new position of the move is a valid square
-                        if not moves[i].new_pos in valid_squares:
-                            moves.remove(moves[i])
-                    # Check if move is castling move and remove it (you can not castle if you are in check)
-                    elif moves[i].is_castle:
-                        moves.remove(moves[i])
+                # Keep every king move which is not castling (you can not castle if you are in check), every
+                # en passant capture (they are only generated if the king is safe after them) and every other move
+                # which ends at one of the valid squares
+                moves = [move for move in moves if (
+                        (move.piece == 6 or move.piece == 16) and not move.is_castle) or (
+                        move.code & EN_PASSANT_FLAG) or (
+                        move.piece != 6 and move.piece != 16 and valid_squares >> (move.code >> 6 & 63) & 1)]
             else:
                 # If there is more than one check we can not block them, because there are at least two
                 # => we have to move the king, so the only valid moves are king moves
@@ -406,16 +681,21 @@ class Board:
             moves = self.get_moves()
 
         # Check if there are no moves
-        if len(moves) == 0:
-
+        if len(moves) == 0 and kind == ALL_MOVES:
             if self.check:
                 self.checkmate = True
             else:
                 self.stalemate = True
+        self.move_kind = ALL_MOVES
 
         # Return all the legal moves
         return moves
 
+    # Get the numbers of all legal moves in current position (see Move and get_legal_moves)
+    # The search only creates the moves it makes, so it does not need a Move for every generated move
+    def get_legal_move_codes(self, kind=ALL_MOVES):
+        return [move.code for move in self.get_legal_moves(kind)]
+
     # Get all possible moves in current position
     def get_moves(self):
         # List for all moves
@@ -435,40 +715,48 @@ class Board:
                         self.get_knight_moves(row, col, moves)
                     # If it is a bishop: get moves in bishop directions
                     if piece == 3 or piece == 13:
-                        self.get_direction_moves(row, col, moves, ((-1, -1), (1, 1), (1, -1), (-1, 1)))
+                        self.get_direction_moves(row, col, moves, BISHOP_DIRECTIONS)
                     # If it is a rook: get moves in rook directions
                     if piece == 4 or piece == 14:
-                        self.get_direction_moves(row, col, moves, ((-1, 0), (0, 1), (1, 0), (0, -1)))
+                        self.get_direction_moves(row, col, moves, ROOK_DIRECTIONS)
                     # If it is a queen: get moves in queen directions
                     if piece == 5 or piece == 15:
-                        self.get_direction_moves(row, col, moves,
-                                                 ((-1, 0), (0, 1), (1, 0), (0, -1), (-1, -1), (1, 1), (1, -1),
-                                                  (-1, 1)), )
+                        self.get_direction_moves(row, col, moves, QUEEN_DIRECTIONS)
                     # If it is a king: get king+castle moves
                     if piece == 6 or piece == 16:
                         self.get_king_moves(row, col, moves)
                         self.get_castle_moves(row, col, moves)
         return moves
 
+    # Adds the move from (row, col) to (r, c) to moves (flags: CASTLE_FLAG, EN_PASSANT_FLAG)
+    # (the generators only call it for moves of the kind which is generated, see move_kind)
+    def add_move(self, moves, row, col, r, c, flags=0):
+        moves.append(Move(row * 8 + col | (r * 8 + c) << 6 | self.state[row][col] << 12 | self.state[r][c] << 17 |
+                          flags))
+
+    # Adds the pawn move from (row, col) to (r, c) to moves (one move for every piece if it is a promotion)
+    def add_pawn_move(self, moves, row, col, r, c, en_passant=False):
+        code = row * 8 + col | (r * 8 + c) << 6 | self.state[row][col] << 12 | self.state[r][c] << 17
+        if en_passant:
+            moves.append(Move(code | EN_PASSANT_FLAG))
+        elif r == 0 or r == 7:
+            # Promotion to queen, rook, bishop or knight (5/15, 4/14, 3/13, 2/12)
+            offset = 0 if self.white_move else 10
+            for piece in (5, 4, 3, 2):
+                moves.append(Move(code | (piece + offset) << 22))
+        else:
+            moves.append(Move(code))
+
     # Get pawn moves from a square (row, col) and add them to moves
     def get_pawn_moves(self, row, col, moves):
+        # The direction from which the piece is pinned (None if it is not pinned) => the piece can still move in the
+        # direction where its pinned from
+        pin_dir = self.pinned.get(row * 8 + col)
         # Set to true if the piece on the square (row, col) is pinned
-        piece_pinned = False
-        # The direction from which the piece is pinned => the piece can still move in the direction where its pinned
-        # from
-        pin_dir = ()
-        # Iterate through all the current pins of the board
-        # (Iterate backwards because we want to remove the pin)
-        for i in range(len(self.pins) - 1, -1, -1):
-            # Check if the square of the pin is equal to the square on which we are currently checking for moves
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                # Set piece pinned to true if so
-                piece_pinned = True
-                # Set the pin direction
-                pin_dir = (self.pins[i][2], self.pins[i][3])
-                # Remove the pin and break
-                self.pins.remove(self.pins[i])
-                break
+        piece_pinned = pin_dir is not None
+        # The kinds of moves which are generated (pushes are quiet moves, captures and en passant are captures)
+        pushes = self.move_kind != CAPTURE_MOVES
+        captures = self.move_kind != QUIET_MOVES
 
         # Check if its whites turn => its a white pawn (we checked this in the get_moves function)
         if self.white_move:
@@ -476,201 +764,184 @@ class Board:
             if row - 1 >= 0:
                 # Normal Move
                 # Check if square in front of pawn is empty
-                if self.state[row - 1][col] == 0:
-                    # Check if pawn is not pinned or the pin direction is the direction where its moving to => it can
-                    # move
-                    if not piece_pinned or pin_dir == (-1, 0):
+                if pushes and self.state[row - 1][col] == 0:
+                    # Check if pawn is not pinned or pinned on its column (the pin direction is the direction where its
+                    # moving to or the opposite one) => it can move
+                    if not piece_pinned or pin_dir[1] == 0:
                         # There is a possible move => on square up
-                        moves.append(Move(self.state, (row, col), (row - 1, col)))
+                        self.add_pawn_move(moves, row, col, row - 1, col)
                         # Check if the two squares in front of pawn are still on the board
                         if row - 2 >= 0:
                             # Check if the two squares in front of pawn are empty and pawn is still on its start square
                             if self.state[row - 2][col] == 0 and row == 6:
                                 # Two square move is possible
-                                moves.append(Move(self.state, (row, col), (row - 2, col)))
+                                self.add_pawn_move(moves, row, col, row - 2, col)
                 # Left Capture
                 # Check if the column left from the pawn is still on the board
-                if col - 1 >= 0:
-                    # Check if pawn is not pinned or the pin direction is the direction where its moving to => it can
-                    # move
-                    if not piece_pinned or pin_dir == (-1, -1):
-                        # Check if there is an enemy piece on square where the pawn can capture
-                        if self.state[row - 1][col - 1] > 10:
+                if captures and col - 1 >= 0:
+                    # Check if there is an enemy piece on square where the pawn can capture
+                    if self.state[row - 1][col - 1] > 10:
+                        # Check if pawn is not pinned or pinned on the diagonal where its moving to => it can move
+                        if not piece_pinned or pin_dir == (-1, -1) or pin_dir == (1, 1):
                             # Capture move is possible
-                            moves.append(Move(self.state, (row, col), (row - 1, col - 1)))
-                        # Check if en passant square is where the pawn can capture
-                        elif self.en_passant_square == (row - 1, col - 1):
-                            # En passant capture is possible
-                            moves.append(Move(self.state, (row, col), (row - 1, col - 1), en_passant=True))
+                            self.add_pawn_move(moves, row, col, row - 1, col - 1)
+                    # Check if en passant square is where the pawn can capture and the king is safe after the capture
+                    elif self.en_passant_square == (row - 1, col - 1) and \
+                            self.en_passant_legal(row, col, row - 1, col - 1):
+                        # En passant capture is possible
+                        self.add_pawn_move(moves, row, col, row - 1, col - 1, en_passant=True)
                 # Right Capture
                 # Check if the column right from the pawn is still on the board
-                if col + 1 < 8:
-                    # Check if pawn is not pinned or the pin direction is the direction where its moving to => it can
-                    # move
-                    if not piece_pinned or pin_dir == (-1, 1):
-                        # Check if there is an enemy piece on square where the pawn can capture
-                        if self.state[row - 1][col + 1] > 10:
+                if captures and col + 1 < 8:
+                    # Check if there is an enemy piece on square where the pawn can capture
+                    if self.state[row - 1][col + 1] > 10:
+                        # Check if pawn is not pinned or pinned on the diagonal where its moving to => it can move
+                        if not piece_pinned or pin_dir == (-1, 1) or pin_dir == (1, -1):
                             # Capture move is possible
-                            moves.append(Move(self.state, (row, col), (row - 1, col + 1)))
-                        # Check if en passant square is where the pawn can capture
-                        elif self.en_passant_square == (row - 1, col + 1):
-                            # En passant capture is possible
-                            moves.append(Move(self.state, (row, col), (row - 1, col + 1), en_passant=True))
+                            self.add_pawn_move(moves, row, col, row - 1, col + 1)
+                    # Check if en passant square is where the pawn can capture and the king is safe after the capture
+                    elif self.en_passant_square == (row - 1, col + 1) and \
+                            self.en_passant_legal(row, col, row - 1, col + 1):
+                        # En passant capture is possible
+                        self.add_pawn_move(moves, row, col, row - 1, col + 1, en_passant=True)
         else:
             # Its a black pawn
             # Check if the square in front of pawn is still on the board
             if row + 1 < 8:
                 # Normal Move
                 # Check if square in front of pawn is empty
-                if self.state[row + 1][col] == 0:
-                    # Check if pawn is not pinned or the pin direction is the direction where its moving to => it can
-                    # move
-                    if not piece_pinned or pin_dir == (1, 0):
-                        moves.append(Move(self.state, (row, col), (row + 1, col)))
+                if pushes and self.state[row + 1][col] == 0:
+                    # Check if pawn is not pinned or pinned on its column (the pin direction is the direction where its
+                    # moving to or the opposite one) => it can move
+                    if not piece_pinned or pin_dir[1] == 0:
+                        self.add_pawn_move(moves, row, col, row + 1, col)
                         # There is a possible move => on square down
                         # Check if the two squares in front of pawn are still on the board
                         if row + 2 < 8:
                             # Check if the two squares in front of pawn are empty and pawn is still on its start square
                             if self.state[row + 2][col] == 0 and row == 1:
                                 # Two square move is possible
-                                moves.append(Move(self.state, (row, col), (row + 2, col)))
+                                self.add_pawn_move(moves, row, col, row + 2, col)
                 # Left Capture
                 # Check if the column left from the pawn is still on the board
-                if col - 1 >= 0:
-                    # Check if pawn is not pinned or the pin direction is the direction where its moving to => it can
-                    # move
-                    if not piece_pinned or pin_dir == (1, -1):
-                        # Check if there is an enemy piece on square where the pawn can capture
-                        if 0 < self.state[row + 1][col - 1] < 10:
+                if captures and col - 1 >= 0:
+                    # Check if there is an enemy piece on square where the pawn can capture
+                    if 0 < self.state[row + 1][col - 1] < 10:
+                        # Check if pawn is not pinned or pinned on the diagonal where its moving to => it can move
+                        if not piece_pinned or pin_dir == (1, -1) or pin_dir == (-1, 1):
                             # Capture move is possible
-                            moves.append(Move(self.state, (row, col), (row + 1, col - 1)))
-                        # Check if en passant square is where the pawn can capture
-                        elif self.en_passant_square == (row + 1, col - 1):
-                            # En passant capture is possible
-                            moves.append(Move(self.state, (row, col), (row + 1, col - 1), en_passant=True))
+                            self.add_pawn_move(moves, row, col, row + 1, col - 1)
+                    # Check if en passant square is where the pawn can capture and the king is safe after the capture
+                    elif self.en_passant_square == (row + 1, col - 1) and \
+                            self.en_passant_legal(row, col, row + 1, col - 1):
+                        # En passant capture is possible
+                        self.add_pawn_move(moves, row, col, row + 1, col - 1, en_passant=True)
                 # Right Capture
                 # Check if the column right from the pawn is still on the board
-                if col + 1 < 8:
-                    # Check if pawn is not pinned or the pin direction is the direction where its moving to => it can
-                    # move
-                    if not piece_pinned or pin_dir == (1, 1):
-                        # Check if there is an enemy piece on square where the pawn can capture
-                        if 0 < self.state[row + 1][col + 1] < 10:
+                if captures and col + 1 < 8:
+                    # Check if there is an enemy piece on square where the pawn can capture
+                    if 0 < self.state[row + 1][col + 1] < 10:
+                        # Check if pawn is not pinned or pinned on the diagonal where its moving to => it can move
+                        if not piece_pinned or pin_dir == (1, 1) or pin_dir == (-1, -1):
                             # Capture move is possible
-                            moves.append(Move(self.state, (row, col), (row + 1, col + 1)))
-                        # Check if en passant square is where the pawn can capture
-                        elif self.en_passant_square == (row + 1, col + 1):
-                            # En passant capture is possible
-                            moves.append(Move(self.state, (row, col), (row + 1, col + 1), en_passant=True))
+                            self.add_pawn_move(moves, row, col, row + 1, col + 1)
+                    # Check if en passant square is where the pawn can capture and the king is safe after the capture
+                    elif self.en_passant_square == (row + 1, col + 1) and \
+                            self.en_passant_legal(row, col, row + 1, col + 1):
+                        # En passant capture is possible
+                        self.add_pawn_move(moves, row, col, row + 1, col + 1, en_passant=True)
+
+    # Check if an en passant capture from (row, col) to (r, c) does not leave the own king in check
+    # (the capture removes two pieces from one row and can capture a checking pawn, so the pins and checks of
+    # get_legal_moves are not enough)
+    def en_passant_legal(self, row, col, r, c):
+        state = self.state
+        pawn = state[row][col]
+        captured = state[row][c]
+        # Make the capture on the state only (the hash and the other information stay the same)
+        state[row][col] = 0
+        state[row][c] = 0
+        state[r][c] = pawn
+        king_r, king_c = self.w_king_pos if self.white_move else self.b_king_pos
+        legal = not self.check_square(king_r, king_c, only_attack=True)
+        # Take the capture back
+        state[row][col] = pawn
+        state[row][c] = captured
+        state[r][c] = 0
+        return legal
 
     # Get knight moves from a square (row, col) and add them to moves
     def get_knight_moves(self, row, col, moves):
-        # Set to true if piece is pinned
-        # No pin direction, because the knight can not move in the direction where its pinned from
-        piece_pinned = False
-        # Iterate through all the current pins of the board
-        # (Iterate backwards because we want to remove the pin)
-        for i in range(len(self.pins) - 1, -1, -1):
-            # Check if the square of the pin is equal to the square on which we are currently checking for moves
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                # Set piece pinned to true if so
-                piece_pinned = True
-                # Remove the pin and break
-                self.pins.remove(self.pins[i])
-                break
-        # All the possible moves a knight can make
-        knight_moves = [(-1, -2), (-2, -1), (-2, 1), (-1, 2), (1, -2), (2, -1), (2, 1), (1, 2)]
-        # Iterate through the knight moves
-        for m in knight_moves:
-            # Check if the current square + the knight move is still on the board
-            if 0 <= row + m[0] < 8 and 0 <= col + m[1] < 8:
-                # Check if the piece is not pinned => it can move
-                if not piece_pinned:
-                    # Check if the square where its moving to is empty or an enemy piece is there
-                    if (self.state[row + m[0]][col + m[1]] < 10 and not self.white_move) or self.state[row + m[0]][
-                        col + m[1]] == 0 or (
-                            self.state[row + m[0]][col + m[1]] > 10 and self.white_move):
-                        # Found a possible knight move and add it to the list
-                        moves.append(Move(self.state, (row, col), (row + m[0], col + m[1])))
+        # Check if the piece is pinned => it can not move
+        # (No pin direction, because the knight can not move in the direction where its pinned from)
+        if row * 8 + col in self.pinned:
+            return
+        kind = self.move_kind
+        # Iterate through the squares the knight can move to
+        for r, c, step_r, step_c in KNIGHT_SQUARES[row * 8 + col]:
+            piece = self.state[r][c]
+            # Check if the square where its moving to is empty (quiet move) or an enemy piece is there (capture)
+            if piece == 0:
+                if kind != CAPTURE_MOVES:
+                    self.add_move(moves, row, col, r, c)
+            elif (piece > 10) == self.white_move and kind != QUIET_MOVES:
+                self.add_move(moves, row, col, r, c)
 
     # Get moves in specific directions from a square (row, col) and add them to moves
     def get_direction_moves(self, row, col, moves, directions):
+        # The direction from which the piece is pinned (None if it is not pinned) => the piece can still move in the
+        # direction where its pinned from
+        pin_dir = self.pinned.get(row * 8 + col)
         # Set to true if the piece on the square (row, col) is pinned
-        piece_pinned = False
-        # The direction from which the piece is pinned => the piece can still move in the direction where its pinned from
-        pin_dir = ()
-        # Iterate through all the current pins of the board
-        # (Iterate backwards because we want to remove the pin)
-        for i in range(len(self.pins) - 1, -1, -1):
-            # Check if the square of the pin is equal to the square on which we are currently checking for moves
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                # Set piece pinned to true if so
-                piece_pinned = True
-                # Set the pin direction
-                pin_dir = (self.pins[i][2], self.pins[i][3])
-                # Remove the pin and break
-                self.pins.remove(self.pins[i])
-                break
+        piece_pinned = pin_dir is not None
+        kind = self.move_kind
 
         # Iterate through the directions
-        for d in directions:
-            # Iterate through all the squares in this direction
-            for i in range(1, 8):
-                # Get the new coordinates (the old square + i squares in direction d)
-                r = row + d[0] * i
-                c = col + d[1] * i
-
-                # Check if the new coordinates are still on the board
-                if 0 <= r < 8 and 0 <= c < 8:
-                    # Check if the piece is not pinned or the direction is the same as the direction we are trying to
-                    # move (also negative because the pieces can move backwards as well)
-                    if not piece_pinned or pin_dir == d or pin_dir == (-d[0], -d[1]):
-                        # Set the square value, the piece can move to
-                        possible_capture = self.state[r][c]
-                        # Check if the square is empty
-                        if possible_capture == 0:
-                            # A possible move was found
-                            moves.append(Move(self.state, (row, col), (r, c)))
-                        # Check if there is an enemy piece on the new square
-                        elif (possible_capture > 10 and self.white_move) or (
-                                0 < possible_capture < 10 and not self.white_move):
-                            # A possible capture move was found
-                            moves.append(Move(self.state, (row, col), (r, c)))
-                            # Break because we cant move through enemy pieces
-                            break
-                        else:
-                            # We found an ally piece => cant move through ally pieces, so break
-                            break
-                else:
-                    # We are off the board => break
-                    break
+        for j in directions:
+            # Check if the piece is not pinned or the direction is the same as the direction we are trying to
+            # move (also negative because the pieces can move backwards as well)
+            d = DIRECTIONS[j]
+            if not piece_pinned or pin_dir == d or pin_dir == (-d[0], -d[1]):
+                # Iterate through all the squares in this direction
+                for r, c in RAY_SQUARES[row * 8 + col][j]:
+                    # Set the square value, the piece can move to
+                    possible_capture = self.state[r][c]
+                    # Check if the square is empty
+                    if possible_capture == 0:
+                        # A possible move was found (only the squares behind it are needed for captures)
+                        if kind != CAPTURE_MOVES:
+                            self.add_move(moves, row, col, r, c)
+                    # Check if there is an enemy piece on the new square
+                    elif (possible_capture > 10) == self.white_move:
+                        # A possible capture move was found
+                        if kind != QUIET_MOVES:
+                            self.add_move(moves, row, col, r, c)
+                        # Break because we cant move through enemy pieces
+                        break
+                    else:
+                        # We found an ally piece => cant move through ally pieces, so break
+                        break
 
     # Get king moves from a square (row, col) and add them to moves
     def get_king_moves(self, row, col, moves):
-        # All directions in which a king can move
-        directions = ((-1, 0), (0, 1), (1, 0), (0, -1), (-1, -1), (1, 1), (1, -1), (-1, 1))
-        # iterate through directions
-        for d in directions:
-            # Get the new coordinates (the old square + i squares in direction d)
-            r = row + d[0]
-            c = col + d[1]
-            # Check if the new coordinates are still on the board
-            if 0 <= r < 8 and 0 <= c < 8:
-                # Set the square value, the king can move to
-                possible_capture = self.state[r][c]
-                # Check if the square is empty or there is an enemy piece on it
-                if possible_capture == 0 or (possible_capture > 10 and self.white_move) or (
-                        0 < possible_capture < 10 and not self.white_move):
-                    # Check if there would be a check on the new king position
-                    check, checks, pins, = self.check_square(r, c)
-                    if not check:
-                        # If there is no attacker on the new king square it is a possible move
-                        moves.append(Move(self.state, (row, col), (r, c)))
+        kind = self.move_kind
+        # iterate through the squares next to the king
+        for r, c in KING_SQUARES[row * 8 + col]:
+            # Set the square value, the king can move to
+            possible_capture = self.state[r][c]
+            # Check if the square is empty or there is an enemy piece on it (and the move is of the kind which is
+            # generated, before the expensive test of the square)
+            if (possible_capture == 0 and kind != CAPTURE_MOVES) or (
+                    possible_capture != 0 and (possible_capture > 10) == self.white_move and kind != QUIET_MOVES):
+                # Check if there would be a check on the new king position
+                if not self.check_square(r, c, only_attack=True):
+                    # If there is no attacker on the new king square it is a possible move
+                    self.add_move(moves, row, col, r, c)
 
     # Get castle moves from a square (row, col) and add them to moves
     def get_castle_moves(self, row, col, moves):
-        # Check if in check (Can not castle if in check
-        if not self.check:
+        # Check if in check (Can not castle if in check); castling is a quiet move, so it is not needed for captures
+        if not self.check and self.move_kind != CAPTURE_MOVES:
             # Check if its whites turn
             if self.white_move:
                 # Check white has the castling right and the squares between rook and king are empty + check if the
@@ -681,14 +952,14 @@ class Board:
                                                                                                   only_attack=True) and not self.check_square(
                     7, 3, only_attack=True):
                     # White queen side castle is possible
-                    moves.append(Move(self.state, (row, col), (7, 2), is_castle=True))
+                    self.add_move(moves, row, col, 7, 2, CASTLE_FLAG)
                 # Check white has the castling right and the squares between rook and king are empty + check if the
                 # king or the rook is attacked after castle
                 if self.w_king_castle and self.state[7][5] == 0 and self.state[7][6] == 0 and self.state[7][
                     7] == 4 and not self.check_square(7, 6, only_attack=True) and not self.check_square(7, 5,
                                                                                                         only_attack=True):
                     # White king side castle is possible
-                    moves.append(Move(self.state, (row, col), (7, 6), is_castle=True))
+                    self.add_move(moves, row, col, 7, 6, CASTLE_FLAG)
             else:
                 # Check for black castling Check black has the castling right and the squares between rook and king
                 # are empty + check if the king or the rook is attacked after castle
@@ -698,45 +969,123 @@ class Board:
                                                                                                    only_attack=True) and not self.check_square(
                     0, 3, only_attack=True):
                     # Black queen side castle is possible
-                    moves.append(Move(self.state, (row, col), (0, 2), is_castle=True))
+                    self.add_move(moves, row, col, 0, 2, CASTLE_FLAG)
                 # Check black has the castling right and the squares between rook and king are empty + check if the
                 # king or the rook is attacked after castle
                 if self.b_king_castle and self.state[0][5] == 0 and self.state[0][6] == 0 and self.state[0][
                     7] == 14 and not self.check_square(0, 6, only_attack=True) and not self.check_square(0, 5,
                                                                                                          only_attack=True):
                     # Black king side castle is possible
-                    moves.append(Move(self.state, (row, col), (0, 6), is_castle=True))
+                    self.add_move(moves, row, col, 0, 6, CASTLE_FLAG)
+
+
+# Reads an EPD file line by line and yields (board, operations) for every position
+# operations: {opcode: operand} of the line (e.g. 'bm Nf3; id "test 1";' => {"bm": "Nf3", "id": "test 1"})
+# Only one position is in memory at a time, so large files can be read
+def read_epd(path, board_class=Board):
+    with open(path) as file:
+        for line in file:
+            fields = line.split(None, 4)
+            # Skip empty lines and comments
+            if len(fields) < 4 or line.startswith("#"):
+                continue
+            operations = {}
+            if len(fields) > 4:
+                for operation in fields[4].split(";"):
+                    parts = operation.strip().split(None, 1)
+                    if parts:
+                        operations[parts[0]] = parts[1].strip('"') if len(parts) > 1 else ""
+            # The halfmove clock and the fullmove number are operations in EPD
+            fen = " ".join(fields[:4]) + " " + operations.get("hmvc", "0") + " " + operations.get("fmvn", "1")
+            yield board_class.from_fen(fen), operations
+
+
+# Reads a tab separated file with a fen column (e.g. the openings) and yields (board, row) for every line
+# row: {column name: value} of the line
+def read_fen_table(path, board_class=Board, fen_column="fen"):
+    with open(path, newline="") as file:
+        for row in csv.DictReader(file, delimiter="\t"):
+            yield board_class.from_fen(row[fen_column]), row
+
+
+# Returns the number of a move from (row, col) to (r, c) in the state (see Move)
+# promotion_piece: piece number the pawn becomes (None => queen, if the move is a promotion)
+def encode_move(state, old_pos, new_pos, en_passant=False, is_castle=False, promotion_piece=None):
+    piece = state[old_pos[0]][old_pos[1]]
+    code = old_pos[0] * 8 + old_pos[1] | (new_pos[0] * 8 + new_pos[1]) << 6 | piece << 12 | \
+        state[new_pos[0]][new_pos[1]] << 17
+    # Check if the move is a pawn promotion
+    if (piece == 1 and new_pos[0] == 0) or (piece == 11 and new_pos[0] == 7):
+        code |= (promotion_piece if promotion_piece is not None else piece + 4) << 22
+    if en_passant:
+        code |= EN_PASSANT_FLAG
+    if is_castle:
+        code |= CASTLE_FLAG
+    return code
+
+
+# Creates a move from (row, col) to (r, c) in the state (the same as Move(encode_move(...)))
+def create_move(state, old_pos, new_pos, en_passant=False, is_castle=False, promotion_piece=None):
+    return Move(encode_move(state, old_pos, new_pos, en_passant, is_castle, promotion_piece))
 
 
 # The class of a move which contains information about it
+# It only stores the number of the move (see the bits at the top), the information is read out of the number
 class Move:
-    # Initialize the move
-    def __init__(self, state, old_pos, new_pos, en_passant=False, is_castle=False):
-        # Piece which moves
-        self.piece = state[old_pos[0]][old_pos[1]]
-        # Piece/Number which is on the square its moving to
-        self.captured_piece = state[new_pos[0]][new_pos[1]]
-        # Position where its moving from
-        self.old_pos = old_pos
-        # Position where its moving to
-        self.new_pos = new_pos
-        # Extra information
-        # Set to true if the move is an en passant capture
-        self.en_passant_capture = en_passant
-        # Set to true if the move is a castling move
-        self.is_castle = is_castle
-        # Later set, when making the move. It checks if the move broke a castling right
-        self.broke_king_side_castle = False
-        self.broke_queen_side_castle = False
-        # Set to true if the move is a promotion
-        self.promotion = (self.piece == 1 and new_pos[0] == 0) or (
-                self.piece == 11 and new_pos[0] == 7)
-
-    # Comparing moves
+    __slots__ = ("code",)
+
+    # Initialize the move with its number
+    def __init__(self, code):
+        self.code = code
+
+    # Piece which moves
+    @property
+    def piece(self):
+        return self.code >> 12 & 31
+
+    # Piece/Number which is on the square its moving to
+    @property
+    def captured_piece(self):
+        return self.code >> 17 & 31
+
+    # Position where its moving from
+    @property
+    def old_pos(self):
+        return SQUARE_POS[self.code & 63]
+
+    # Position where its moving to
+    @property
+    def new_pos(self):
+        return SQUARE_POS[self.code >> 6 & 63]
+
+    # The piece the pawn becomes (0 if the move is not a promotion)
+    @property
+    def promotion_piece(self):
+        return self.code >> 22 & 31
+
+    # Set to true if the move is a promotion
+    @property
+    def promotion(self):
+        return self.code >> 22 & 31 != 0
+
+    # Set to true if the move is an en passant capture
+    @property
+    def en_passant_capture(self):
+        return self.code & EN_PASSANT_FLAG != 0
+
+    # Set to true if the move is a castling move
+    @property
+    def is_castle(self):
+        return self.code & CASTLE_FLAG != 0
+
+    # Comparing moves (start, end, piece and promotion piece)
     def __eq__(self, other):
         # Check if the other is a move
         if isinstance(other, Move):
-            # Compare start, end and piece
-            return other.new_pos == self.new_pos and other.old_pos == self.old_pos and self.piece == other.piece
+            return (self.code ^ other.code) & MOVE_IDENTITY_MASK == 0
 
         return False
+
+    # Hash of the move (equal moves have the same hash)
+    def __hash__(self):
+        return self.code & MOVE_IDENTITY_MASK
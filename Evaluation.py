@@ -0,0 +1,135 @@
+# The evaluation terms are kept up to date by the board (see Board.put_piece), so a position is evaluated without
+# looking at the squares:
+# board.mg_score: material + piece square values for the middle game (white - black)
+# board.eg_score: material + piece square values for the end game (white - black)
+# board.phase: the material left on the board (MAX_PHASE at the start, 0 if only pawns and kings are left)
+# board.w_castled, board.b_castled: set if the player has castled
+
+# Values of the pieces (pawn, knight, bishop, rook, queen, king) in the middle game and the end game
+MG_PIECE_VALUES = [10, 30, 30, 50, 90, 0]
+EG_PIECE_VALUES = [12, 28, 30, 54, 94, 0]
+
+# Piece square tables of the white pieces (row 0 is the row of the black pieces, like the state)
+# Pawns should control the center and advance
+PAWN_MG = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [10, 10, 10, 10, 10, 10, 10, 10],
+    [2, 2, 4, 6, 6, 4, 2, 2],
+    [1, 1, 2, 5, 5, 2, 1, 1],
+    [0, 0, 0, 4, 4, 0, 0, 0],
+    [1, -1, -2, 0, 0, -2, -1, 1],
+    [1, 2, 2, -4, -4, 2, 2, 1],
+    [0, 0, 0, 0, 0, 0, 0, 0]]
+# In the end game every step to the promotion counts
+PAWN_EG = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [16, 16, 16, 16, 16, 16, 16, 16],
+    [10, 10, 10, 10, 10, 10, 10, 10],
+    [6, 6, 6, 6, 6, 6, 6, 6],
+    [3, 3, 3, 3, 3, 3, 3, 3],
+    [1, 1, 1, 1, 1, 1, 1, 1],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0]]
+# Knights are strong in the center and weak at the edges
+KNIGHT = [
+    [-10, -8, -6, -6, -6, -6, -8, -10],
+    [-8, -4, 0, 0, 0, 0, -4, -8],
+    [-6, 0, 2, 3, 3, 2, 0, -6],
+    [-6, 1, 3, 4, 4, 3, 1, -6],
+    [-6, 0, 3, 4, 4, 3, 0, -6],
+    [-6, 1, 2, 3, 3, 2, 1, -6],
+    [-8, -4, 0, 1, 1, 0, -4, -8],
+    [-10, -8, -6, -6, -6, -6, -8, -10]]
+# Bishops avoid the corners and edges
+BISHOP = [
+    [-4, -2, -2, -2, -2, -2, -2, -4],
+    [-2, 0, 0, 0, 0, 0, 0, -2],
+    [-2, 0, 1, 2, 2, 1, 0, -2],
+    [-2, 1, 1, 2, 2, 1, 1, -2],
+    [-2, 0, 2, 2, 2, 2, 0, -2],
+    [-2, 2, 2, 2, 2, 2, 2, -2],
+    [-2, 1, 0, 0, 0, 0, 1, -2],
+    [-4, -2, -2, -2, -2, -2, -2, -4]]
+# Rooks belong on the seventh row and the center columns
+ROOK = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [1, 2, 2, 2, 2, 2, 2, 1],
+    [-1, 0, 0, 0, 0, 0, 0, -1],
+    [-1, 0, 0, 0, 0, 0, 0, -1],
+    [-1, 0, 0, 0, 0, 0, 0, -1],
+    [-1, 0, 0, 0, 0, 0, 0, -1],
+    [-1, 0, 0, 0, 0, 0, 0, -1],
+    [0, 0, 0, 1, 1, 0, 0, 0]]
+QUEEN = [
+    [-4, -2, -2, -1, -1, -2, -2, -4],
+    [-2, 0, 0, 0, 0, 0, 0, -2],
+    [-2, 0, 1, 1, 1, 1, 0, -2],
+    [-1, 0, 1, 1, 1, 1, 0, -1],
+    [0, 0, 1, 1, 1, 1, 0, -1],
+    [-2, 1, 1, 1, 1, 1, 0, -2],
+    [-2, 0, 1, 0, 0, 0, 0, -2],
+    [-4, -2, -2, -1, -1, -2, -2, -4]]
+# The king hides behind its pawns in the middle game
+KING_MG = [
+    [-6, -8, -8, -10, -10, -8, -8, -6],
+    [-6, -8, -8, -10, -10, -8, -8, -6],
+    [-6, -8, -8, -10, -10, -8, -8, -6],
+    [-6, -8, -8, -10, -10, -8, -8, -6],
+    [-4, -6, -6, -8, -8, -6, -6, -4],
+    [-2, -4, -4, -4, -4, -4, -4, -2],
+    [4, 4, 0, 0, 0, 0, 4, 4],
+    [4, 6, 2, 0, 0, 2, 6, 4]]
+# and goes to the center in the end game
+KING_EG = [
+    [-10, -8, -6, -4, -4, -6, -8, -10],
+    [-6, -4, -2, 0, 0, -2, -4, -6],
+    [-6, -2, 4, 6, 6, 4, -2, -6],
+    [-6, -2, 6, 8, 8, 6, -2, -6],
+    [-6, -2, 6, 8, 8, 6, -2, -6],
+    [-6, -2, 4, 6, 6, 4, -2, -6],
+    [-6, -6, 0, 0, 0, 0, -6, -6],
+    [-10, -6, -6, -6, -6, -6, -6, -10]]
+
+# The tables of the pieces 1 - 6 (pawn, knight, bishop, rook, queen, king)
+MG_PIECE_TABLES = [PAWN_MG, KNIGHT, BISHOP, ROOK, QUEEN, KING_MG]
+EG_PIECE_TABLES = [PAWN_EG, KNIGHT, BISHOP, ROOK, QUEEN, KING_EG]
+
+# How much each piece counts for the game phase (indexed by the piece number)
+PHASE_WEIGHTS = [0, 0, 1, 1, 2, 4, 0, 0, 0, 0, 0, 0, 1, 1, 2, 4, 0]
+# The phase at the start of the game
+MAX_PHASE = 24
+
+# Bonus for a player who castled
+CASTLED_BONUS = 15
+
+
+# Creates the value of every piece number on every square: table[piece][row * 8 + col]
+# (material + piece square value; the black values are negative and the table is mirrored; piece 0 => 0)
+def create_score_table(piece_values, piece_tables):
+    table = [[0] * 64 for piece in range(17)]
+    for i in range(6):
+        for sq in range(64):
+            row, col = sq // 8, sq % 8
+            table[i + 1][sq] = piece_values[i] + piece_tables[i][row][col]
+            table[i + 11][sq] = -(piece_values[i] + piece_tables[i][7 - row][col])
+    return table
+
+
+# MG_SCORES[piece][row * 8 + col]: middle game value of the piece on the square (positive for white)
+MG_SCORES = create_score_table(MG_PIECE_VALUES, MG_PIECE_TABLES)
+# EG_SCORES[piece][row * 8 + col]: end game value of the piece on the square (positive for white)
+EG_SCORES = create_score_table(EG_PIECE_VALUES, EG_PIECE_TABLES)
+
+
+# Returns the value of the position (negative is good for black and positive is good for white)
+# The middle game and the end game scores are mixed by the phase (the more pieces are left, the more the middle game
+# score counts)
+def evaluate(board):
+    phase = min(board.phase, MAX_PHASE)
+    value = (board.mg_score * phase + board.eg_score * (MAX_PHASE - phase)) // MAX_PHASE
+    # Reward castling
+    if board.w_castled:
+        value += CASTLED_BONUS
+    if board.b_castled:
+        value -= CASTLED_BONUS
+    return value
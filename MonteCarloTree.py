@@ -0,0 +1,198 @@
+import math
+from array import array
+from Board import Board
+from Board import MOVE_IDENTITY_MASK
+from OpeningBook import find_uci_move
+
+# Index of the root node (the position the training games start in)
+ROOT = 0
+# No node (parent of the root, the end of a list of children)
+NO_NODE = -1
+# Exploration rate of the UCB value (the higher the value is, the more is going to be explored)
+EXPLORATION_RATE = 1.4
+# Slots of the child table of a new tree (a power of two, doubled whenever it is half full)
+CHILD_TABLE_SIZE = 1024
+# The columns of a node in the order they are saved (name, type code of the array)
+COLUMNS = [("visits", 'i'), ("wins", 'd'), ("parent", 'i'), ("first_child", 'i'), ("next_sibling", 'i'),
+           ("move", 'i'), ("child_count", 'H'), ("legal_count", 'h')]
+
+
+# The monte carlo tree as columns of arrays indexed by the node, so a node is a few numbers instead of a dict with
+# its whole move history (like the transposition table)
+# The children of a node are a linked list (first_child, next_sibling), a child is found by its move in the child
+# table: a hash table of arrays (open addressing) {node << 27 | move number & MOVE_IDENTITY_MASK: child}
+class MonteCarloTree:
+    def __init__(self):
+        # Simulated games through the node and their results for the player who made the move of the node
+        # (win 1, draw 0.5, loss 0)
+        self.visits = array('i')
+        self.wins = array('d')
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        # Number of the move which leads to the node (see Board.Move; 0 at the root)
+        self.move = array('i')
+        self.child_count = array('H')
+        # Number of legal moves in the position of the node (-1 => not known yet, the node was never expanded)
+        self.legal_count = array('h')
+        # The child table (key 0 => empty slot, a move number is never 0)
+        self.child_keys = array('q', [0]) * CHILD_TABLE_SIZE
+        self.child_nodes = array('i', [0]) * CHILD_TABLE_SIZE
+        self.add_node(NO_NODE, 0)
+
+    # Number of nodes
+    def __len__(self):
+        return len(self.visits)
+
+    # Adds a node for the move (number, see Board.Move) to the children of the parent and returns its index
+    def add_node(self, parent, move_code):
+        node = len(self.visits)
+        self.visits.append(0)
+        self.wins.append(0)
+        self.parent.append(parent)
+        self.first_child.append(NO_NODE)
+        self.move.append(move_code)
+        self.child_count.append(0)
+        self.legal_count.append(-1)
+        if parent == NO_NODE:
+            self.next_sibling.append(NO_NODE)
+        else:
+            self.next_sibling.append(self.first_child[parent])
+            self.first_child[parent] = node
+            self.child_count[parent] += 1
+            self.add_child_key(parent, move_code, node)
+        return node
+
+    # Returns the slot of the key in the child table (the slot of the key or the empty slot where it belongs)
+    def find_slot(self, key):
+        keys = self.child_keys
+        mask = len(keys) - 1
+        slot = (key * 11400714819323198485 >> 32) & mask
+        while keys[slot] != key and keys[slot] != 0:
+            slot = slot + 1 & mask
+        return slot
+
+    # Adds the child of the parent after the move (number) to the child table
+    def add_child_key(self, parent, move_code, child):
+        # Double the table if it is half full (the children are inserted again)
+        if 2 * len(self) > len(self.child_keys):
+            keys = self.child_keys
+            nodes = self.child_nodes
+            self.child_keys = array('q', [0]) * (2 * len(keys))
+            self.child_nodes = array('i', [0]) * (2 * len(keys))
+            for index in range(len(keys)):
+                if keys[index] != 0:
+                    slot = self.find_slot(keys[index])
+                    self.child_keys[slot] = keys[index]
+                    self.child_nodes[slot] = nodes[index]
+        key = parent << 27 | move_code & MOVE_IDENTITY_MASK
+        slot = self.find_slot(key)
+        self.child_keys[slot] = key
+        self.child_nodes[slot] = child
+
+    # Returns the child of the node after the move or NO_NODE if the move was not expanded yet
+    def get_child(self, node, move):
+        slot = self.find_slot(node << 27 | move.code & MOVE_IDENTITY_MASK)
+        return self.child_nodes[slot] if self.child_keys[slot] != 0 else NO_NODE
+
+    # Returns the children of the node
+    def get_children(self, node):
+        children = []
+        child = self.first_child[node]
+        while child != NO_NODE:
+            children.append(child)
+            child = self.next_sibling[child]
+        return children
+
+    # The node has a child for every legal move (the game did not end in it)
+    def is_fully_expanded(self, node):
+        return self.legal_count[node] > 0 and self.child_count[node] == self.legal_count[node]
+
+    # Returns the ucb value of the node: the value which decides how likely a node is visited next
+    def ucb_value(self, node):
+        visits = self.visits[node]
+        # First part: win rate + 10^-6 so there is no division error, when the node has not been visited yet
+        # => Exploitation
+        # Second part: the rate how often the node is visited compared to its parent => Exploration
+        return self.wins[node] / (visits + 10 ** -6) + EXPLORATION_RATE * math.sqrt(
+            math.log(self.visits[self.parent[node]] + 10 ** -6) / (visits + 10 ** -10))
+
+    # Adds the result of a simulated game (1 white won, -1 black won, 0 draw) to the node and all nodes above it
+    # white_move: white is to move in the position of the node
+    def backpropagate(self, node, result, white_move):
+        while node != NO_NODE:
+            self.visits[node] += 1
+            # The player who made the move of the node is the one who is not to move
+            if result == 0:
+                self.wins[node] += 0.5
+            elif (result == 1) != white_move:
+                self.wins[node] += 1
+            white_move = not white_move
+            node = self.parent[node]
+
+    # Saves the tree into a binary file (number of nodes, then every column)
+    def save(self, path):
+        with open(path, "wb") as file:
+            array('i', [len(self)]).tofile(file)
+            for name, type_code in COLUMNS:
+                getattr(self, name).tofile(file)
+
+    # Loads a tree out of a binary file (see save)
+    @classmethod
+    def load(cls, path):
+        tree = cls()
+        with open(path, "rb") as file:
+            count = array('i')
+            count.fromfile(file, 1)
+            for name, type_code in COLUMNS:
+                column = array(type_code)
+                column.fromfile(file, count[0])
+                setattr(tree, name, column)
+        size = CHILD_TABLE_SIZE
+        while size < 2 * len(tree):
+            size *= 2
+        tree.child_keys = array('q', [0]) * size
+        tree.child_nodes = array('i', [0]) * size
+        for node in range(1, len(tree)):
+            tree.add_child_key(tree.parent[node], tree.move[node], node)
+        return tree
+
+    # Converts a tree of nested dicts (the old mcts1.json: move_history, visits, win, children; starting at the start
+    # position) into a tree
+    # The moves are made on a board, so the nodes get the numbers of the legal moves (castling, en passant)
+    # (win was counted for the player to move in the position of the node, now it is for the player who moved)
+    @classmethod
+    def from_dict(cls, root):
+        tree = cls()
+        board = Board()
+        tree.visits[ROOT] = root["visits"]
+        tree.wins[ROOT] = root["visits"] - root["win"]
+        # Depth first: (dict of the node, node, move to make before its children) or None => take back the move
+        stack = [(root, ROOT, None)]
+        while len(stack) > 0:
+            entry = stack.pop()
+            if entry is None:
+                board.unmake_move()
+                continue
+            node_dict, node, move = entry
+            if move is not None:
+                board.make_move(move)
+                stack.append(None)
+            if len(node_dict["children"]) == 0:
+                continue
+            legal_moves = board.get_legal_moves()
+            tree.legal_count[node] = len(legal_moves)
+            for child_dict in node_dict["children"]:
+                notation = child_dict["move_history"][-1]
+                child_move = find_uci_move(notation, legal_moves)
+                # Old notations of promotions have no promotion letter (the pawn became a queen)
+                if child_move is None:
+                    child_move = find_uci_move(notation[:4] + "q", legal_moves)
+                # Skip a child whose move is not legal (with all the nodes below it)
+                if child_move is None:
+                    continue
+                child = tree.add_node(node, child_move.code)
+                tree.visits[child] = child_dict["visits"]
+                tree.wins[child] = child_dict["visits"] - child_dict["win"]
+                stack.append((child_dict, child, child_move))
+        return tree
@@ -0,0 +1,93 @@
+from Board import Move
+from Board import CAPTURE_MOVES, QUIET_MOVES
+from Board import EN_PASSANT_FLAG
+
+# Size of the history table (two players * 64 old squares * 64 new squares)
+HISTORY_SIZE = 2 * 64 * 64
+
+# Value of the captured piece used to order the captures (indexed by the piece number, same values as the evaluation)
+CAPTURE_VALUES = [0, 10, 30, 30, 50, 90, 0, 0, 0, 0, 0, 10, 30, 30, 50, 90, 0]
+
+
+# Order of the attacking pieces (the least valuable attacker first; indexed by the piece number)
+ATTACKER_ORDER = [0, 1, 2, 3, 4, 5, 6, 0, 0, 0, 0, 1, 2, 3, 4, 5, 6]
+
+
+# Returns the value of the piece the move (number) captures (an en passant capture takes a pawn, but the captured
+# piece of its number is 0)
+def capture_value(code):
+    return CAPTURE_VALUES[code >> 17 & 31] if not code & EN_PASSANT_FLAG else CAPTURE_VALUES[1]
+
+
+# Key function of the capture ordering (of the move numbers): most valuable victim, least valuable attacker (MVV-LVA)
+# (QxP comes after PxP)
+def mvv_lva(code):
+    return capture_value(code) * 8 - ATTACKER_ORDER[code >> 12 & 31]
+
+
+# Returns the index of the move (number) in the history table (player, old square, new square)
+def history_index(code):
+    return (code >> 12 & 31 > 10) << 12 | code & 4095
+
+
+# Check if the hash move can be made in the position of the board
+# The transposition table compares the whole zobrist key, so the move was legal in this position, only the pieces are
+# checked (so a move of a colliding key can never corrupt the board)
+def is_valid_hash_move(board, code):
+    piece = code >> 12 & 31
+    return piece != 0 and (piece < 10) == board.white_move and board.piece_on(code & 63) == piece and \
+        board.piece_on(code >> 6 & 63) == code >> 17 & 31
+
+
+# Yields the legal moves of the board in stages, a stage is only generated if the moves before did not cause a cutoff
+# (the search stops taking moves from the generator at a cutoff):
+# 1. the hash move (the best move of an earlier search of the position)
+# 2. the captures (MVV-LVA)
+# 3. the killer moves (quiet moves which caused a cutoff in another position at the same depth)
+# 4. the remaining quiet moves (ordered by the history table if there is one: list of HISTORY_SIZE scores of the moves
+#    which caused cutoffs, see history_index)
+# If there is no legal move, checkmate or stalemate is set on the board (like get_legal_moves does)
+# The moves are generated and sorted as numbers, a Move is only created when it is yielded
+def pick_moves(board, hash_move=None, killers=(), history=None):
+    # Number of the moves which were yielded
+    count = 0
+
+    # Hash move (the number of a move is the same in every position with the same zobrist key)
+    hash_code = 0
+    if hash_move is not None and is_valid_hash_move(board, hash_move.code):
+        hash_code = hash_move.code
+        count += 1
+        yield hash_move
+
+    # Captures
+    captures = board.get_legal_move_codes(CAPTURE_MOVES)
+    captures.sort(key=mvv_lva, reverse=True)
+    for code in captures:
+        if code != hash_code:
+            count += 1
+            yield Move(code)
+
+    # Killer moves (only if they are legal quiet moves in this position; a quiet move has the same number in every
+    # position where it is legal)
+    quiets = board.get_legal_move_codes(QUIET_MOVES)
+    played_killers = []
+    for killer in killers:
+        if killer is not None and killer.code != hash_code and killer.code in quiets:
+            played_killers.append(killer.code)
+            count += 1
+            yield killer
+
+    # Quiet moves
+    if history is not None:
+        quiets.sort(key=lambda quiet: history[history_index(quiet)], reverse=True)
+    for code in quiets:
+        if code != hash_code and code not in played_killers:
+            count += 1
+            yield Move(code)
+
+    # No legal move => the game ended
+    if count == 0:
+        if board.check:
+            board.checkmate = True
+        else:
+            board.stalemate = True
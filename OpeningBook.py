@@ -0,0 +1,313 @@
+import csv
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+from Board import Board
+from Board import EN_PASSANT_FLAG, ZOBRIST_EN_PASSANT
+
+# Folder of the opening files
+OPENINGS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "openings")
+# Sources of the default book (tab separated: eco, name, fen, moves; the moves in UCI notation, e.g. e2e4 e7e5 g1f3)
+BOOK_SOURCES = [os.path.join(OPENINGS_FOLDER, name) for name in ["a.tsv", "b.tsv", "c.tsv", "d.tsv", "e.tsv"]]
+# The compiled default book (compiled out of the sources if it is missing or older than one of them)
+BOOK_FILE = os.path.join(OPENINGS_FOLDER, "book.bin")
+
+# Layout of a compiled book (all numbers big endian, similar to a Polyglot book):
+# header: magic, number of move records, number of name records
+# move records: key of the position (see get_book_key), book move (see encode_book_move), weight
+# (sorted by the key and the move)
+# name records: key of a position where an opening ends, offset of "eco<tab>name<newline>" in the text
+# (sorted by the key)
+# text: the names of the openings
+HEADER = struct.Struct(">8sII")
+MAGIC = b"CHESSBK1"
+MOVE_RECORD = struct.Struct(">QHH")
+NAME_RECORD = struct.Struct(">QI")
+# Highest weight of a move (the number of lines or games which play the move in the position)
+MAX_WEIGHT = 65535
+# Games of PGN files are only added up to this ply (the book should only know openings)
+PGN_MAX_PLY = 30
+
+# Piece types of the letters of a SAN move (without the color, a move without a letter is a pawn move)
+SAN_PIECES = {"N": 2, "B": 3, "R": 4, "Q": 5, "K": 6}
+# Results which end the moves of a game in a PGN file
+PGN_RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+
+# Returns the number of a move in the book: old square | new square << 6 | promotion piece type << 12
+# (the squares as row * 8 + col like in the move code, the piece type 2 - 5 without the color, 0 => no promotion)
+def encode_book_move(move):
+    code = move.code
+    return code & 4095 | (code >> 22 & 31) % 10 << 12
+
+
+# Returns the square (row * 8 + col) of a notation (e.g. e4)
+def notation_to_square(notation):
+    return (8 - int(notation[1])) * 8 + ord(notation[0]) - ord("a")
+
+
+# Returns the key of the position in the book: the zobrist key of the board, but (like in Polyglot) with the en passant
+# square only if a pawn can capture en passant, so a line which ends with a double pawn move transposes too
+# legal_moves: the legal moves of the board (None => generated if they are needed)
+def get_book_key(board, legal_moves=None):
+    key = board.zobrist_key
+    if board.en_passant_square != ():
+        if legal_moves is None:
+            legal_moves = board.get_legal_moves()
+        if not any(move.code & EN_PASSANT_FLAG for move in legal_moves):
+            key ^= ZOBRIST_EN_PASSANT[board.en_passant_square[1]]
+    return key
+
+
+# Returns the legal move which is the book move or None
+def find_legal_move(book_move, legal_moves):
+    for move in legal_moves:
+        if encode_book_move(move) == book_move:
+            return move
+    return None
+
+
+# Returns the legal move of a UCI notation (e.g. e2e4, e7e8q) or None
+def find_uci_move(notation, legal_moves):
+    book_move = notation_to_square(notation[0:2]) | notation_to_square(notation[2:4]) << 6
+    if len(notation) > 4:
+        book_move |= SAN_PIECES[notation[4].upper()] << 12
+    return find_legal_move(book_move, legal_moves)
+
+
+# Returns the legal move of a SAN notation (e.g. Nf3, exd5, O-O, e8=Q+) or None
+def find_san_move(notation, legal_moves):
+    notation = notation.rstrip("+#!?")
+    # Castling (the king moves to the g or the c column)
+    if notation.startswith("O-O") or notation.startswith("0-0"):
+        col = 2 if notation in ("O-O-O", "0-0-0") else 6
+        for move in legal_moves:
+            if move.is_castle and move.code >> 6 & 7 == col:
+                return move
+        return None
+    promotion = 0
+    if "=" in notation:
+        notation, letter = notation.split("=", 1)
+        promotion = SAN_PIECES[letter[0]]
+    elif notation[-1] in "NBRQ":
+        promotion = SAN_PIECES[notation[-1]]
+        notation = notation[:-1]
+    piece = SAN_PIECES.get(notation[0], 1)
+    if piece != 1:
+        notation = notation[1:]
+    new_sq = notation_to_square(notation[-2:])
+    # Column and/or row of the old square if more than one piece can move to the new square
+    hint = notation[:-2].replace("x", "")
+    for move in legal_moves:
+        code = move.code
+        old_sq = code & 63
+        if (code >> 12 & 31) % 10 == piece and code >> 6 & 63 == new_sq and (code >> 22 & 31) % 10 == promotion and \
+                all(old_sq & 7 == ord(char) - ord("a") if char.isalpha() else old_sq >> 3 == 8 - int(char)
+                    for char in hint):
+            return move
+    return None
+
+
+# Reads a PGN file and yields the moves (SAN notations) of every game
+# (tags, comments, variations, numbers and annotations are skipped)
+def read_pgn_games(path):
+    moves = []
+    in_comment = False
+    variation_depth = 0
+    with open(path) as file:
+        for line in file:
+            # A tag starts the next game
+            if not in_comment and line.startswith("["):
+                if len(moves) > 0:
+                    yield moves
+                moves = []
+                continue
+            if not in_comment:
+                line = line.split(";")[0]
+            for token in line.replace("{", " { ").replace("}", " } ").replace("(", " ( ").replace(")", " ) ").split():
+                if in_comment:
+                    in_comment = token != "}"
+                elif token == "{":
+                    in_comment = True
+                elif token == "(":
+                    variation_depth += 1
+                elif token == ")":
+                    variation_depth -= 1
+                elif variation_depth == 0 and token in PGN_RESULTS:
+                    if len(moves) > 0:
+                        yield moves
+                    moves = []
+                elif variation_depth == 0 and not token.startswith("$"):
+                    # Remove the move number (e.g. 12. or 12...)
+                    token = token.lstrip("0123456789.")
+                    if token != "":
+                        moves.append(token)
+    if len(moves) > 0:
+        yield moves
+
+
+# Plays the moves on the board and adds every position and move to the weights {(book key, book move): weight}
+# find_move: returns the legal move of a notation (find_uci_move or find_san_move)
+# Returns the key of the position at the end of the line (None if a move could not be played, the line is only added
+# until this move); the board is back in the position before the line afterwards
+def add_line(board, weights, notations, find_move):
+    legal_moves = board.get_legal_moves()
+    end_key = get_book_key(board, legal_moves)
+    for notation in notations:
+        move = find_move(notation, legal_moves)
+        if move is None:
+            end_key = None
+            break
+        entry = (end_key, encode_book_move(move))
+        weights[entry] = weights.get(entry, 0) + 1
+        board.make_move(move)
+        legal_moves = board.get_legal_moves()
+        end_key = get_book_key(board, legal_moves)
+    while len(board.move_history) > 0:
+        board.unmake_move()
+    return end_key
+
+
+# Compiles the sources (tsv files of openings or PGN files of games) into a book file
+def compile_book(sources=None, path=BOOK_FILE):
+    # {(book key, book move): weight} and {book key: eco<tab>name} (see get_book_key)
+    weights = {}
+    names = {}
+    board = Board()
+    for source in sources if sources is not None else BOOK_SOURCES:
+        if source.endswith(".pgn"):
+            for game in read_pgn_games(source):
+                add_line(board, weights, game[:PGN_MAX_PLY], find_san_move)
+        else:
+            with open(source, newline="") as tsv_file:
+                for row in csv.DictReader(tsv_file, delimiter="\t"):
+                    key = add_line(board, weights, row["moves"].split(), find_uci_move)
+                    if key is not None:
+                        names[key] = row["eco"] + "\t" + row["name"]
+
+    text = bytearray()
+    name_records = []
+    for key, name in sorted(names.items()):
+        name_records.append(NAME_RECORD.pack(key, len(text)))
+        text += (name + "\n").encode()
+    # Write into a new file in the same folder first, so a book which is read (or compiled) at the same time is never
+    # half written
+    descriptor, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(descriptor, "wb") as book_file:
+            book_file.write(HEADER.pack(MAGIC, len(weights), len(name_records)))
+            for (key, book_move), weight in sorted(weights.items()):
+                book_file.write(MOVE_RECORD.pack(key, book_move, min(weight, MAX_WEIGHT)))
+            book_file.write(b"".join(name_records))
+            book_file.write(text)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return len(weights), len(name_records)
+
+
+# A compiled book (see compile_book), the file is mapped into memory and searched by binary search, so opening it is
+# instant and nothing of it is loaded before it is used
+# The moves are found by the zobrist key of the position, so a book move is also found after a transposition
+class OpeningBook:
+    def __init__(self, path=BOOK_FILE):
+        with open(path, "rb") as book_file:
+            self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.move_count, self.name_count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError(path + " is not a compiled opening book")
+        self.names_offset = HEADER.size + self.move_count * MOVE_RECORD.size
+        self.text_offset = self.names_offset + self.name_count * NAME_RECORD.size
+
+    # Returns the index of the first record with the key (or a bigger key) of the records at the offset
+    def find(self, key, offset, count, record):
+        low = 0
+        high = count
+        while low < high:
+            middle = (low + high) // 2
+            if record.unpack_from(self.data, offset + middle * record.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # Returns the book moves of the position as [(book move, weight)] (see encode_book_move)
+    def get_moves(self, key):
+        moves = []
+        index = self.find(key, HEADER.size, self.move_count, MOVE_RECORD)
+        while index < self.move_count:
+            record_key, book_move, weight = MOVE_RECORD.unpack_from(self.data, HEADER.size + index * MOVE_RECORD.size)
+            if record_key != key:
+                break
+            moves.append((book_move, weight))
+            index += 1
+        return moves
+
+    # Returns a legal move of the book for the position (chosen at random, weighted by the frequency) or None
+    # (only legal moves are taken, so a position with the same key can never get a wrong move)
+    def choose_move(self, key, legal_moves):
+        moves = []
+        weights = []
+        for book_move, weight in self.get_moves(key):
+            move = find_legal_move(book_move, legal_moves)
+            if move is not None:
+                moves.append(move)
+                weights.append(weight)
+        if len(moves) == 0:
+            return None
+        return random.choices(moves, weights)[0]
+
+    # Returns (eco, name) of the opening which ends in the position or None
+    def get_opening(self, key):
+        index = self.find(key, self.names_offset, self.name_count, NAME_RECORD)
+        if index == self.name_count:
+            return None
+        record_key, text_offset = NAME_RECORD.unpack_from(self.data, self.names_offset + index * NAME_RECORD.size)
+        if record_key != key:
+            return None
+        start = self.text_offset + text_offset
+        eco, name = self.data[start:self.data.find(b"\n", start)].decode().split("\t")
+        return eco, name
+
+    def close(self):
+        self.data.close()
+
+
+# The book of the files in the openings folder (opened at the first use, see get_default_book)
+default_book = None
+# The default book could not be compiled or opened (it is not tried again)
+default_book_failed = False
+# Only one thread compiles and opens the default book (the engines of several games can ask for it at the same time)
+default_book_lock = threading.Lock()
+
+
+# Returns the book of the files in the openings folder (compiled first if the book file is missing or outdated)
+# or None if there is no book (e.g. the openings folder is read only or a source is missing)
+def get_default_book():
+    global default_book, default_book_failed
+    with default_book_lock:
+        if default_book is None and not default_book_failed:
+            try:
+                if not os.path.exists(BOOK_FILE) or \
+                        any(os.path.getmtime(source) > os.path.getmtime(BOOK_FILE) for source in BOOK_SOURCES):
+                    compile_book(BOOK_SOURCES, BOOK_FILE)
+                default_book = OpeningBook(BOOK_FILE)
+            except (OSError, ValueError) as error:
+                print("No opening book: " + str(error))
+                default_book_failed = True
+        return default_book
+
+
+# Usage: python OpeningBook.py [book file] [source files (tsv or pgn)]
+# (without sources the files of the openings folder are compiled)
+if __name__ == "__main__":
+    book_path = sys.argv[1] if len(sys.argv) > 1 else BOOK_FILE
+    book_sources = sys.argv[2:] if len(sys.argv) > 2 else BOOK_SOURCES
+    move_count, name_count = compile_book(book_sources, book_path)
+    print(book_path + ": " + str(move_count) + " moves, " + str(name_count) + " openings")
@@ -0,0 +1,113 @@
+import sys
+import time
+from multiprocessing import Pool
+from Board import Board
+from Board import Move
+from BitBoard import BitBoard
+
+# Standard test positions with the known number of leaf nodes for every depth
+# (name, FEN, [nodes at depth 1, nodes at depth 2, ...])
+PERFT_POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     [20, 400, 8902, 197281, 4865609]),
+    # Castling, en passant, promotions and pins in one position
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    # En passant captures which expose the king on the row
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    # Promotions, underpromotions and captured rooks (castling rights)
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+# Counts the leaf nodes of the move tree of the board to the depth
+def perft(board, depth):
+    codes = board.get_legal_move_codes()
+    # The moves of the last ply don't have to be made
+    if depth <= 1:
+        return len(codes) if depth == 1 else 1
+    nodes = 0
+    for code in codes:
+        board.make_move(Move(code))
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+# Returns the number of leaf nodes after every root move {move: nodes} (used to find the move with wrong counts)
+def divide(board, depth):
+    result = {}
+    for move in board.get_legal_moves():
+        board.make_move(move)
+        result[move] = perft(board, depth - 1)
+        board.unmake_move()
+    return result
+
+
+# Counts the nodes after a single root move (runs in a worker process, so the board is created from the FEN)
+def perft_root_move(args):
+    board_class, fen, move_code, depth = args
+    board = board_class()
+    board.load_fen(fen)
+    board.make_move(Move(move_code))
+    return move_code, perft(board, depth - 1)
+
+
+# Same as divide, but the root moves are split across a pool of processes
+def parallel_divide(board_class, fen, depth, processes=None):
+    board = board_class()
+    board.load_fen(fen)
+    tasks = [(board_class, fen, move.code, depth) for move in board.get_legal_moves()]
+    with Pool(processes) as pool:
+        return {Move(code): nodes for code, nodes in pool.imap_unordered(perft_root_move, tasks)}
+
+
+# Runs perft on all standard positions up to the depth and prints the node count, the time and the nodes per second
+# Returns true if every count is correct
+def run_suite(max_depth=3, board_class=Board, processes=0):
+    correct = True
+    total_nodes = 0
+    total_time = 0
+    for name, fen, counts in PERFT_POSITIONS:
+        for depth in range(1, min(max_depth, len(counts)) + 1):
+            start = time.time()
+            if processes and depth > 1:
+                nodes = sum(parallel_divide(board_class, fen, depth, processes).values())
+            else:
+                board = board_class()
+                board.load_fen(fen)
+                nodes = perft(board, depth)
+            elapsed = time.time() - start
+            total_nodes += nodes
+            total_time += elapsed
+            status = "ok" if nodes == counts[depth - 1] else "FAILED (expected " + str(counts[depth - 1]) + ")"
+            correct = correct and nodes == counts[depth - 1]
+            print(name, "depth", depth, "nodes", nodes, "time", round(elapsed, 3),
+                  "nps", int(nodes / elapsed) if elapsed > 0 else 0, status)
+    print("total nodes", total_nodes, "time", round(total_time, 3),
+          "nps", int(total_nodes / total_time) if total_time > 0 else 0)
+    return correct
+
+
+# Prints the node count of every root move of the position (compare with another engine to find the wrong move)
+def print_divide(fen, depth, board_class=Board):
+    board = board_class()
+    board.load_fen(fen)
+    result = divide(board, depth)
+    for move in sorted(result, key=lambda m: (m.old_pos, m.new_pos)):
+        print(move.old_pos, move.new_pos, move.promotion_piece, result[move])
+    print("nodes", sum(result.values()))
+
+
+# Usage: python Perft.py [depth] [bitboard] [processes]
+if __name__ == "__main__":
+    suite_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    suite_board = BitBoard if len(sys.argv) > 2 and sys.argv[2] == "bitboard" else Board
+    suite_processes = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    sys.exit(0 if run_suite(suite_depth, suite_board, suite_processes) else 1)
@@ -0,0 +1,136 @@
+import json
+import time
+
+# Names of the counters of the pruning techniques (see Ai.negamax)
+# (lmr_researched: reduced moves which had to be searched again with the full depth)
+PRUNING_NAMES = ["null_move_searched", "null_move_cutoffs", "futility_pruned", "reverse_futility_pruned",
+                 "lmr_reduced", "lmr_researched"]
+
+
+# Counters and results of one search, filled by the search and returned with the best move
+# Every finished iteration of the iterative deepening is added to iterations (see end_iteration) and passed to the
+# hook, if there is one (e.g. json_lines_hook)
+class SearchStats:
+    def __init__(self, hook=None):
+        self.start_time = time.time()
+        # Start of the current iteration
+        self.iteration_start_time = self.start_time
+        # Positions of the main search and the quiescence search
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        # Beta cutoffs of the main search and how many of them were caused by the first move of the node
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Probes and hits of the transposition tables of the processes of the parallel search
+        # (the table of the searching process is added by end_iteration)
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.pruning = {name: 0 for name in PRUNING_NAMES}
+        # Results of the finished iterations (see end_iteration)
+        self.iterations = []
+        # Result of the last finished iteration
+        self.depth = 0
+        self.score = 0
+        self.principal_variation = []
+        self.tt_hit_rate = 0
+        # The move was taken out of the opening book (no search)
+        self.book_move = False
+        self.hook = hook
+
+    # All positions (main search and quiescence search)
+    def total_nodes(self):
+        return self.nodes + self.quiescence_nodes
+
+    # Seconds since the start of the search
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    # All positions per second since the start of the search
+    def nodes_per_second(self):
+        elapsed = self.elapsed()
+        return int(self.total_nodes() / elapsed) if elapsed > 0 else 0
+
+    # Rate of the beta cutoffs caused by the first move (0 - 1; the higher the better the move ordering)
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs != 0 else 0
+
+    # Effective branching factor: positions of the last iteration / positions of the iteration before
+    def branching_factor(self):
+        if len(self.iterations) < 2 or self.iterations[-2]["iteration_nodes"] == 0:
+            return 0
+        return self.iterations[-1]["iteration_nodes"] / self.iterations[-2]["iteration_nodes"]
+
+    # Adds the counters of the search of another process
+    def add(self, other):
+        self.nodes += other.nodes
+        self.quiescence_nodes += other.quiescence_nodes
+        self.cutoffs += other.cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+        self.tt_probes += other.tt_probes
+        self.tt_hits += other.tt_hits
+        for name in PRUNING_NAMES:
+            self.pruning[name] += other.pruning[name]
+
+    # Records a finished iteration
+    # score: for the player to move at the first node; principal_variation: the expected moves as notations;
+    # transposition_table: the table of the searching process
+    def end_iteration(self, depth, score, principal_variation, transposition_table):
+        now = time.time()
+        probes = self.tt_probes + transposition_table.probes
+        self.depth = depth
+        self.score = score
+        self.principal_variation = principal_variation
+        self.tt_hit_rate = (self.tt_hits + transposition_table.hits) / probes if probes != 0 else 0
+        previous_nodes = self.iterations[-1]["nodes"] + self.iterations[-1]["quiescence_nodes"] \
+            if len(self.iterations) > 0 else 0
+        self.iterations.append({
+            "depth": depth,
+            "score": score,
+            "nodes": self.nodes,
+            "quiescence_nodes": self.quiescence_nodes,
+            "iteration_nodes": self.total_nodes() - previous_nodes,
+            "time": round(now - self.start_time, 4),
+            "iteration_time": round(now - self.iteration_start_time, 4),
+            "nodes_per_second": self.nodes_per_second(),
+            "first_move_cutoff_rate": round(self.first_move_cutoff_rate(), 4),
+            "tt_hit_rate": round(self.tt_hit_rate, 4),
+            "pruning": dict(self.pruning),
+            "principal_variation": principal_variation})
+        self.iterations[-1]["branching_factor"] = round(self.branching_factor(), 3)
+        self.iteration_start_time = now
+        if self.hook is not None:
+            self.hook(self.iterations[-1])
+
+    # Returns the results as a dict (can be written as JSON)
+    def to_dict(self):
+        return {"depth": self.depth, "score": self.score, "nodes": self.nodes,
+                "quiescence_nodes": self.quiescence_nodes, "time": round(self.elapsed(), 4),
+                "nodes_per_second": self.nodes_per_second(),
+                "branching_factor": round(self.branching_factor(), 3),
+                "first_move_cutoff_rate": round(self.first_move_cutoff_rate(), 4),
+                "tt_hit_rate": round(self.tt_hit_rate, 4), "pruning": dict(self.pruning),
+                "principal_variation": self.principal_variation, "book_move": self.book_move,
+                "iterations": self.iterations}
+
+    # One line summary of the last iteration
+    def __str__(self):
+        return "depth " + str(self.depth) + " score " + str(self.score) + " nodes " + str(self.nodes) + \
+            " qnodes " + str(self.quiescence_nodes) + " nps " + str(self.nodes_per_second()) + \
+            " ebf " + str(round(self.branching_factor(), 2)) + " first move cutoffs " + \
+            str(round(self.first_move_cutoff_rate() * 100)) + "% tt hits " + str(round(self.tt_hit_rate * 100)) + \
+            "% pv " + " ".join(self.principal_variation)
+
+
+# Hook which prints every iteration as one line (the score in pawns for the player to move)
+def print_hook(iteration):
+    print("Evaluation in " + str(iteration["depth"]) + " Moves: " + str(iteration["score"] / 10) + " (nodes " +
+          str(iteration["nodes"]) + " qnodes " + str(iteration["quiescence_nodes"]) + " nps " +
+          str(iteration["nodes_per_second"]) + " pv " + " ".join(iteration["principal_variation"]) + ")")
+
+
+# Returns a hook which writes every iteration as a line of JSON into the file (an open text file)
+def json_lines_hook(file):
+    def hook(iteration):
+        file.write(json.dumps(iteration) + "\n")
+        file.flush()
+    return hook
@@ -0,0 +1,85 @@
+from array import array
+
+# Types of the stored scores
+# The score is the real value of the position
+EXACT = 0
+# The real value is at least the score (the search was cut off, because the score was too good)
+LOWER_BOUND = 1
+# The real value is at most the score (no move was better than the score)
+UPPER_BOUND = 2
+
+# Bytes of one entry (key: 8, score: 4, depth: 1, bound: 1, age: 1, move number: 4)
+ENTRY_SIZE = 19
+
+
+# Fixed size hash table of already searched positions, indexed by the zobrist key of the board
+# Every index (bucket) has two slots: the first keeps the deepest search, the second is always replaced
+class TranspositionTable:
+    # Initialize the table with a memory budget in megabytes
+    def __init__(self, size_mb=16):
+        # Number of buckets (a power of two, so the index of a key is key & mask)
+        buckets = 1
+        while buckets * 4 * ENTRY_SIZE <= size_mb * 1024 * 1024:
+            buckets *= 2
+        self.mask = buckets - 1
+        # The entries are stored in columns (two slots per bucket)
+        self.keys = array('Q', [0]) * (2 * buckets)
+        self.scores = array('i', [0]) * (2 * buckets)
+        # Depth -1 => empty slot
+        self.depths = array('b', [-1]) * (2 * buckets)
+        self.bounds = array('B', [0]) * (2 * buckets)
+        # The search the entry was stored in (old entries are replaced first)
+        self.ages = array('B', [0]) * (2 * buckets)
+        # Number of the best move (see Board.Move; 0 => no move)
+        self.moves = array('I', [0]) * (2 * buckets)
+        self.age = 0
+
+        # Statistics
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    # Starts a new search: entries of older searches can be replaced in the deep slots
+    def new_search(self):
+        self.age = (self.age + 1) % 256
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    # Deletes all entries
+    def clear(self):
+        size = len(self.keys)
+        self.keys = array('Q', [0]) * size
+        self.depths = array('b', [-1]) * size
+        self.moves = array('I', [0]) * size
+
+    # Returns (depth, score, bound, move number) of the position with the key or None if it is not stored
+    def probe(self, key):
+        self.probes += 1
+        i = (key & self.mask) << 1
+        # Check both slots of the bucket
+        if self.keys[i] != key or self.depths[i] < 0:
+            i += 1
+            if self.keys[i] != key or self.depths[i] < 0:
+                return None
+        self.hits += 1
+        return self.depths[i], self.scores[i], self.bounds[i], self.moves[i]
+
+    # Stores the result of a search of the position with the key (move: number of the best move or 0)
+    def store(self, key, depth, score, bound, move):
+        self.stores += 1
+        i = (key & self.mask) << 1
+        # Use the deep slot if the search is at least as deep, it is the same position or the entry is old
+        # else use the slot which is always replaced
+        if not (depth >= self.depths[i] or self.keys[i] == key or self.ages[i] != self.age):
+            i += 1
+        self.keys[i] = key
+        self.depths[i] = min(depth, 127)
+        self.scores[i] = score
+        self.bounds[i] = bound
+        self.ages[i] = self.age
+        self.moves[i] = move
+
+    # Returns the rate of probes which found a stored position (0 - 1)
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes != 0 else 0
@@ -1,7 +1,10 @@
 import pygame as p
 import Ai
+from concurrent.futures import ThreadPoolExecutor, wait
 from Board import Board
-from Board import Move
+from Board import create_move
+from BitBoard import BitBoard
+from SearchStats import print_hook
 
 # Pygame information
 HEIGHT = WIDTH = 512
@@ -10,6 +13,16 @@ MAX_FPS = 15
 SQUARE_SIZE = HEIGHT // 8
 # Images dict {int : image}
 IMAGES = {}
+# Use the bitboard engine (faster move generation) instead of the nested list board
+USE_BITBOARD = True
+# Thinking time of the ai per move in seconds
+AI_MOVE_TIME = 2
+# Number of processes the ai searches with (0 => one process)
+AI_SEARCH_PROCESSES = 0
+# The ai searches on the time of the human (pondering)
+AI_PONDER = True
+# Print every iteration of the search of the ai (not of the pondering)
+AI_VERBOSE = False
 
 
 # Loads the images from the images folder
@@ -118,7 +131,7 @@ def handle_human_turn(event, board, legal_moves, selected_pos, highlighted):
             # The selected position is not equal to the square the player just clicked
             elif selected_pos != (r, c):
                 # Define the move (old pos = selected_pos, new pos = (r, c))
-                move = Move(board.state, selected_pos, (r, c))
+                move = create_move(board.state, selected_pos, (r, c))
                 # Check if move is legal
                 for legal_move in legal_moves:
                     if move == legal_move:
@@ -144,6 +157,29 @@ def handle_human_turn(event, board, legal_moves, selected_pos, highlighted):
         return False, highlighted, selected_pos
 
 
+# Finds the move of the ai on a copy of the board (runs in the thread of the ai, so the window keeps drawing)
+# Returns the move or None
+def think(engine, board):
+    # Take the move of the pondering if the human played the expected move
+    move = engine.finish_pondering(board, AI_MOVE_TIME)
+    # Find the best move
+    if move is None:
+        move = engine.find_best_move(board, board.get_legal_moves(), AI_MOVE_TIME, processes=AI_SEARCH_PROCESSES,
+                                     stats_hook=print_hook if AI_VERBOSE else None)
+    return move
+
+
+# Stops the ai (the search of the move and the pondering) and waits until its thread is done, the result is not used
+def cancel_thinking(engine, ai_future):
+    engine.stop_pondering()
+    if ai_future is not None:
+        # Stop again until the thread is done (after a stopped pondering the thread can start a new search)
+        while not ai_future.done():
+            engine.stop()
+            wait([ai_future], timeout=0.05)
+        ai_future.result()
+
+
 # Main Method with game loop
 def main():
     # Init pygame and setup screen
@@ -153,8 +189,13 @@ def main():
     screen = p.display.set_mode((WIDTH, HEIGHT))
     clock = p.time.Clock()
 
-    # Initialize a new board
-    board = Board()
+    # Initialize a new board (the ai and the monte carlo training work with both board types)
+    board = BitBoard() if USE_BITBOARD else Board()
+    # The engine of the ai (keeps its tables during the game)
+    engine = Ai.Engine()
+    # The ai thinks in its own thread, the result is polled in the game loop (None => the ai is not thinking)
+    ai_executor = ThreadPoolExecutor(max_workers=1)
+    ai_future = None
 
     # Load the images
     load_images()
@@ -188,6 +229,16 @@ def main():
             if event.type == p.QUIT:
                 # Stop the game loop
                 playing = False
+            # Undo with the z key (back to the last position where a human has to move)
+            elif event.type == p.KEYDOWN and event.key == p.K_z and len(board.move_history) > 0:
+                cancel_thinking(engine, ai_future)
+                ai_future = None
+                board.unmake_move()
+                while len(board.move_history) > 0 and not (player1 and board.white_move) and not (
+                        player2 and not board.white_move) and (player1 or player2):
+                    board.unmake_move()
+                moved, highlighted, selected_pos = False, [], ()
+                legal_moves = board.get_legal_moves()
             # Check if its a human turn
             elif ((player1 and board.white_move) or (
                     player2 and not board.white_move)) and not moved:  # Its a human turn
@@ -213,15 +264,32 @@ def main():
             elif board.stalemate:
                 print('Stalemate')
             legal_moves = board.get_legal_moves()
+            # The game is over, there is nothing to ponder on anymore
+            if board.checkmate or board.stalemate or len(legal_moves) == 0:
+                engine.stop_pondering()
 
         # AI has to move
-        if not (player1 and board.white_move) and not (player2 and not board.white_move):
-            # Find the best move
+        if not (player1 and board.white_move) and not (player2 and not board.white_move) and playing and \
+                len(legal_moves) > 0:
+            # Start thinking on a copy of the board (the search makes and takes back moves on its board)
+            if ai_future is None:
+                ai_future = ai_executor.submit(think, engine, board.copy())
+            # The ai found a move
+            elif ai_future.done():
+                move = ai_future.result()
+                ai_future = None
+                # Make the same move out of the legal moves of the board (the move belongs to the copy)
+                if move is not None and move in legal_moves:
+                    board.make_move(legal_moves[legal_moves.index(move)])
+                    moved = True
+                    # Think about the answer while the human is thinking
+                    if AI_PONDER and ((player1 and board.white_move) or (player2 and not board.white_move)):
+                        engine.start_pondering(board)
 
-            move = Ai.find_best_move(board, legal_moves, 120)
-            if move is not None:
-                board.make_move(move)
-                moved = True
+    # Stop the ai, its thread and the processes of the parallel search
+    cancel_thinking(engine, ai_future)
+    ai_executor.shutdown()
+    engine.close_search_pool()
 
 
 if __name__ == "__main__":